@@ -0,0 +1,213 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Banco gerado por banco-de-dados/script2.py (relativo a este arquivo, não ao cwd)
+CAMINHO_BANCO = os.environ.get(
+    'ANS_BANCO',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'banco-de-dados', 'ans_database.db'))
+
+# Conexões somente leitura mantidas abertas por processo
+CONEXOES_MAXIMAS = 8
+
+# Statements preparados mantidos por conexão (cada combinação de filtros é um texto de SQL)
+STATEMENTS_POR_CONEXAO = 64
+
+# Intervalo mínimo (em segundos) entre duas verificações do mtime do banco
+INTERVALO_VERIFICACAO = 1.0
+
+CATEGORIA_PADRAO = 'eventos_sinistros_medico_hospitalar'
+
+
+class BancoIndisponivel(Exception):
+    """O banco não existe ou ainda não tem o consolidado de despesas"""
+
+
+def _sql_maiores_despesas(por_trimestre, por_uf, por_modalidade):
+    """Texto da consulta para uma combinação de filtros.
+
+    Os filtros ausentes ficam fora do SQL (em vez de "? IS NULL OR ...") para
+    que cada variante use o índice idx_consolidado_categoria; como são só oito
+    textos possíveis, todos cabem no cache de statements da conexão.
+    """
+    filtros = ['d.categoria = ?', 'd.ano = ?']
+    if por_trimestre:
+        filtros.append('d.trimestre = ?')
+    if por_uf:
+        filtros.append('o.uf = ?')
+    if por_modalidade:
+        filtros.append('o.modalidade = ? COLLATE NOCASE')
+
+    # Com filtro de UF ou modalidade só entram operadoras do cadastro
+    juncao = 'JOIN' if por_uf or por_modalidade else 'LEFT JOIN'
+
+    return f"""
+    SELECT
+        d.registro_ans,
+        o.razao_social,
+        o.uf,
+        o.modalidade,
+        SUM(d.valor) AS valor_despesa
+    FROM
+        despesas_consolidadas d
+    {juncao}
+        operadoras_ativas o ON d.registro_ans = o.registro_ans
+    WHERE
+        {' AND '.join(filtros)}
+    GROUP BY
+        d.registro_ans
+    ORDER BY
+        valor_despesa DESC
+    LIMIT ?
+    """
+
+
+SQL_MAIORES_DESPESAS = {
+    (por_trimestre, por_uf, por_modalidade): _sql_maiores_despesas(por_trimestre, por_uf, por_modalidade)
+    for por_trimestre in (False, True)
+    for por_uf in (False, True)
+    for por_modalidade in (False, True)
+}
+
+SQL_PERIODOS = """
+    SELECT DISTINCT ano, trimestre
+    FROM despesas_consolidadas
+    ORDER BY ano DESC, trimestre DESC
+"""
+
+SQL_ULTIMO_ANO = "SELECT MAX(ano) FROM despesas_consolidadas WHERE categoria = ?"
+
+SQL_CATEGORIAS = """
+    SELECT DISTINCT categoria
+    FROM categorias_contas
+    WHERE categoria IS NOT NULL
+    ORDER BY categoria
+"""
+
+
+class BancoAnalises:
+    """Consultas analíticas sobre o ans_database.db, com conexões somente leitura reaproveitadas.
+
+    As conexões ficam num pool por processo (abertas sob demanda, até
+    CONEXOES_MAXIMAS) e são descartadas se o processo mudar, como acontece
+    nos workers do gunicorn criados por fork. A versão é o mtime do banco e
+    do WAL: toda importação que termina grava um deles, então quem usa a
+    versão na chave de cache deixa de ver os resultados antigos.
+    """
+
+    def __init__(self, caminho_banco=CAMINHO_BANCO, conexoes_maximas=CONEXOES_MAXIMAS,
+                 intervalo_verificacao=INTERVALO_VERIFICACAO):
+        self.caminho_banco = os.path.abspath(caminho_banco)
+        self.conexoes_maximas = conexoes_maximas
+        self.intervalo_verificacao = intervalo_verificacao
+        self._lock = threading.Lock()
+        self._pool = queue.LifoQueue()
+        self._abertas = 0
+        self._pid = os.getpid()
+        self._versao = None
+        self._ultima_verificacao = 0.0
+
+    def _abrir(self):
+        if not os.path.exists(self.caminho_banco):
+            raise BancoIndisponivel(f"Banco de dados não encontrado: {self.caminho_banco}")
+        conn = sqlite3.connect(f"file:{self.caminho_banco}?mode=ro", uri=True,
+                               check_same_thread=False,
+                               cached_statements=STATEMENTS_POR_CONEXAO)
+        conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def _verificar_processo(self):
+        """Depois de um fork, as conexões herdadas não podem ser usadas pelo filho"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pool = queue.LifoQueue()
+                self._abertas = 0
+                self._pid = os.getpid()
+
+    @contextmanager
+    def conexao(self):
+        """Empresta uma conexão do pool (ou abre uma nova) e a devolve no fim"""
+        self._verificar_processo()
+        pool = self._pool
+
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                abrir = self._abertas < self.conexoes_maximas
+                if abrir:
+                    self._abertas += 1
+            if abrir:
+                try:
+                    conn = self._abrir()
+                except Exception:
+                    with self._lock:
+                        self._abertas -= 1
+                    raise
+            else:
+                conn = pool.get()
+
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    def _mtime_banco(self):
+        mtimes = []
+        for sufixo in ('', '-wal'):
+            try:
+                mtimes.append(os.stat(self.caminho_banco + sufixo).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def versao(self):
+        """Identificador do conteúdo atual do banco, verificado no máximo a cada intervalo"""
+        agora = time.monotonic()
+        if self._versao is None or agora - self._ultima_verificacao >= self.intervalo_verificacao:
+            self._versao = self._mtime_banco()
+            self._ultima_verificacao = agora
+        return self._versao
+
+    def _consultar(self, sql, parametros=()):
+        with self.conexao() as conn:
+            try:
+                return conn.execute(sql, parametros).fetchall()
+            except sqlite3.OperationalError as e:
+                # Banco criado antes do consolidado (ou ainda sem importação nenhuma)
+                raise BancoIndisponivel(f"Consulta indisponível no banco atual: {e}") from e
+
+    def periodos(self):
+        """Pares (ano, trimestre) presentes no consolidado, do mais recente ao mais antigo"""
+        return self._consultar(SQL_PERIODOS)
+
+    def categorias(self):
+        return [categoria for (categoria,) in self._consultar(SQL_CATEGORIAS)]
+
+    def maiores_despesas(self, categoria=CATEGORIA_PADRAO, ano=None, trimestre=None,
+                         uf=None, modalidade=None, limite=10):
+        """Top N operadoras por despesa na categoria, no trimestre ou no ano inteiro.
+
+        Sem ano, usa o último ano com dados da categoria. Devolve (ano, linhas).
+        """
+        if ano is None:
+            ano = self._consultar(SQL_ULTIMO_ANO, (categoria,))[0][0]
+            if ano is None:
+                return None, []
+
+        parametros = [categoria, ano]
+        if trimestre is not None:
+            parametros.append(trimestre)
+        if uf:
+            parametros.append(uf)
+        if modalidade:
+            parametros.append(modalidade)
+        parametros.append(limite)
+
+        sql = SQL_MAIORES_DESPESAS[(trimestre is not None, bool(uf), bool(modalidade))]
+        return ano, self._consultar(sql, parametros)
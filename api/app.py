@@ -1,111 +1,285 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import pandas as pd
-import re
+from werkzeug.routing import BaseConverter
+
+import serializacao
+from analises import BancoAnalises, BancoIndisponivel, CATEGORIA_PADRAO
+from cache import CacheLRU
+from normalizacao import normalizar_texto
+from registro import RegistroOperadoras
+from serializacao import ProvedorJSON, resposta_com_linhas
 
 app = Flask(__name__)
+app.json = ProvedorJSON(app)  # jsonify usa orjson quando disponível
 CORS(app)  # Permitir requisições cross-origin
 
-# Função para carregar o CSV de operadoras
-def carregar_dados_operadoras():
-    try:
-        import os
-        caminho_csv = os.path.join('backend', 'Relatorio_cadop.csv')
-        
-        # Tente determinar o delimitador correto
-        # Experimente diferentes opções de delimitador
-        for delimiter in [',', ';', '\t', '|']:
-            try:
-                print(f"Tentando ler com delimitador: '{delimiter}'")
-                df = pd.read_csv(caminho_csv, 
-                                encoding='latin1', 
-                                delimiter=delimiter,
-                                error_bad_lines=False,  # Ignora linhas problemáticas
-                                warn_bad_lines=True)    # Avisa quando encontrar linha ruim
-                print(f"Sucesso! CSV carregado com delimitador '{delimiter}'. Colunas: {df.columns.tolist()}")
-                return df
-            except Exception as e:
-                print(f"  Falha com delimitador '{delimiter}': {e}")
-        
-        # Se todos os delimitadores falharem, tente ler uma linha de cada vez
-        print("Tentando ler o arquivo linha por linha...")
-        with open(caminho_csv, 'r', encoding='latin1') as file:
-            linhas = file.readlines()
-            
-        print(f"Primeiras 10 linhas do arquivo:")
-        for i, linha in enumerate(linhas[:10]):
-            print(f"Linha {i+1}: {linha.strip()}")
-            
-        # Última tentativa: carregar ignorando erros
-        print("Tentando carregar ignorando erros...")
-        df = pd.read_csv(caminho_csv, 
-                         encoding='latin1',
-                         on_bad_lines='skip')
-        
-        print(f"CSV carregado ignorando linhas problemáticas. {len(df)} linhas lidas.")
-        return df
-    except Exception as e:
-        print(f"Erro ao carregar CSV: {e}")
-        import traceback
-        traceback.print_exc()
-        return pd.DataFrame()
-    
+# Segmento só de dígitos, para que /api/operadoras/lote e afins não caiam na consulta por Registro ANS
+class ConversorDigitos(BaseConverter):
+    regex = r'\d+'
+
+app.url_map.converters['digitos'] = ConversorDigitos
+
+# Cadastro de operadoras mantido em memória durante toda a vida do processo
+registro = RegistroOperadoras()
+registro.carregar()
+
+# Limites de paginação da busca
+LIMITE_PADRAO = 10
+LIMITE_MAXIMO = 100
+
+# Cache de resultados da busca; a chave inclui a versão do cadastro, então
+# uma recarga do CSV invalida as entradas antigas automaticamente
+cache_busca = CacheLRU(max_entradas=2048, max_bytes=32 * 1024 * 1024, ttl=300.0)
+
 # Função para buscar operadoras com base em texto
-def buscar_operadoras(texto_busca, df):
-    # Convertendo para minúsculas para busca case-insensitive
-    texto_busca = texto_busca.lower()
-    
-    # Lista de colunas onde faremos a busca
-    colunas_busca = df.columns.tolist()
-    
-    # Convertendo valores para string e realizando a busca
-    resultados = pd.DataFrame()
-    
-    for coluna in colunas_busca:
-        # Filtrando registros que contêm o texto de busca
-        matches = df[df[coluna].astype(str).str.lower().str.contains(texto_busca, na=False)]
-        resultados = pd.concat([resultados, matches]).drop_duplicates()
-    
-    # Ordenando por relevância (poderia ser implementado um score mais sofisticado)
-    # Aqui estamos apenas contando quantas vezes o termo aparece em cada registro
-    def calcular_relevancia(row):
-        score = 0
-        for coluna in colunas_busca:
-            value = str(row[coluna]).lower()
-            score += value.count(texto_busca)
-        return score
-    
-    # Aplicando função de relevância
-    if not resultados.empty:
-        resultados['relevancia'] = resultados.apply(calcular_relevancia, axis=1)
-        resultados = resultados.sort_values('relevancia', ascending=False)
-        resultados = resultados.drop('relevancia', axis=1)
-    
-    return resultados
+def buscar_operadoras(texto_busca, snapshot, limite=None, deslocamento=0):
+    # Mesma normalização aplicada aos registros na carga (acentos, caixa e espaços)
+    texto_busca = normalizar_texto(texto_busca)
+    
+    # O índice de trigramas devolve as posições já ordenadas por relevância
+    # (quantas vezes o termo aparece no registro, somando todas as colunas)
+    return snapshot.indice.buscar(texto_busca, limite, deslocamento)
+
+# Lê um parâmetro inteiro não negativo da query string
+def ler_inteiro(nome, padrao, maximo=None):
+    valor = request.args.get(nome)
+    if valor is None or valor == '':
+        return padrao
+    if not valor.isdigit():
+        raise ValueError(f"Parâmetro '{nome}' deve ser um inteiro não negativo")
+    valor = int(valor)
+    if maximo is not None and valor > maximo:
+        raise ValueError(f"Parâmetro '{nome}' deve ser no máximo {maximo}")
+    return valor
 
 # Rota para busca de operadoras
 @app.route('/api/operadoras/buscar', methods=['GET'])
 def api_buscar_operadoras():
     termo_busca = request.args.get('q', '')
     
-    if not termo_busca:
+    if not normalizar_texto(termo_busca):
         return jsonify({"erro": "Termo de busca não fornecido"}), 400
     
-    df = carregar_dados_operadoras()
+    try:
+        limite = ler_inteiro('limit', LIMITE_PADRAO, LIMITE_MAXIMO)
+        deslocamento = ler_inteiro('offset', 0)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    
+    snapshot = registro.obter()
+    df = snapshot.df
     
     if df.empty:
         return jsonify({"erro": "Falha ao carregar dados das operadoras"}), 500
     
-    resultados = buscar_operadoras(termo_busca, df)
+    # Projeção de colunas: fields=Razao_Social,Cidade,UF
+    campos = [campo.strip() for campo in request.args.get('fields', '').split(',') if campo.strip()]
+    campos_invalidos = [campo for campo in campos if campo not in df.columns]
+    if campos_invalidos:
+        return jsonify({"erro": f"Campos inexistentes: {', '.join(campos_invalidos)}"}), 400
     
-    # Convertendo resultados para JSON
-    resultados_json = resultados.to_dict(orient='records')
+    chave = (snapshot.versao, normalizar_texto(termo_busca), limite, deslocamento, tuple(campos))
+    resultado = cache_busca.obter(chave)
     
-    return jsonify({
+    if resultado is None:
+        total, posicoes = buscar_operadoras(termo_busca, snapshot, limite, deslocamento)
+        
+        # Só a página pedida (e só as colunas pedidas) é serializada; sem projeção,
+        # as linhas já vêm prontas do snapshot
+        linhas = snapshot.linhas(posicoes, campos)
+        resultado = (total, linhas)
+        cache_busca.guardar(chave, resultado, sum(len(linha) for linha in linhas))
+    
+    total, linhas = resultado
+    
+    return resposta_com_linhas({
         "termo_busca": termo_busca,
-        "total_resultados": len(resultados_json),
-        "resultados": resultados_json
+        "total_resultados": total,
+        "limite": limite,
+        "deslocamento": deslocamento
+    }, linhas)
+
+# Limites das sugestões de autocompletar
+SUGESTOES_PADRAO = 10
+SUGESTOES_MAXIMO = 50
+
+# Rota de sugestões por prefixo (Razão Social, Nome Fantasia, Cidade, Registro ANS e CNPJ)
+@app.route('/api/operadoras/autocomplete', methods=['GET'])
+def api_autocompletar_operadoras():
+    termo = request.args.get('q', '')
+    
+    if not normalizar_texto(termo):
+        return jsonify({"erro": "Termo de busca não fornecido"}), 400
+    
+    try:
+        limite = ler_inteiro('limit', SUGESTOES_PADRAO, SUGESTOES_MAXIMO)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    
+    snapshot = registro.obter()
+    sugestoes = snapshot.autocompletar.sugerir(termo, limite)
+    
+    return jsonify({
+        "termo": termo,
+        "sugestoes": [
+            {"campo": campo, "valor": valor, "registro_ans": registro_ans}
+            for campo, valor, registro_ans in sugestoes
+        ]
     })
 
+# Quantidade máxima de chaves em uma consulta em lote
+LOTE_MAXIMO = 1000
+
+# Chave aceita na consulta em lote (bool é subclasse de int, mas não é identificador)
+def chave_valida(valor):
+    return isinstance(valor, str) or (isinstance(valor, int) and not isinstance(valor, bool))
+
+# Resposta padrão para consultas exatas de uma única operadora
+def resposta_operadora(snapshot, posicao, chave, valor):
+    if posicao is None:
+        return jsonify({"erro": f"Operadora com {chave} {valor} não encontrada"}), 404
+    return Response(snapshot.linhas_json[posicao], mimetype='application/json')
+
+# Rota de consulta exata por Registro ANS
+@app.route('/api/operadoras/<digitos:registro_ans>', methods=['GET'])
+def api_operadora_por_registro(registro_ans):
+    snapshot = registro.obter()
+    return resposta_operadora(snapshot, snapshot.posicao_registro_ans(registro_ans), 'Registro ANS', registro_ans)
+
+# Rota de consulta exata por CNPJ (aceita com ou sem pontuação)
+@app.route('/api/operadoras/cnpj/<path:cnpj>', methods=['GET'])
+def api_operadora_por_cnpj(cnpj):
+    snapshot = registro.obter()
+    return resposta_operadora(snapshot, snapshot.posicao_cnpj(cnpj), 'CNPJ', cnpj)
+
+# Rota de consulta exata em lote: {"registros_ans": [...], "cnpjs": [...]}
+@app.route('/api/operadoras/lote', methods=['POST'])
+def api_operadoras_lote():
+    corpo = request.get_json(silent=True)
+    if corpo is None:
+        corpo = {}
+    if not isinstance(corpo, dict):
+        return jsonify({"erro": "O corpo deve ser um objeto JSON"}), 400
+    registros_ans = corpo.get('registros_ans') or []
+    cnpjs = corpo.get('cnpjs') or []
+    
+    if not isinstance(registros_ans, list) or not isinstance(cnpjs, list):
+        return jsonify({"erro": "'registros_ans' e 'cnpjs' devem ser listas"}), 400
+    if not registros_ans and not cnpjs:
+        return jsonify({"erro": "Nenhuma chave fornecida"}), 400
+    if len(registros_ans) + len(cnpjs) > LOTE_MAXIMO:
+        return jsonify({"erro": f"No máximo {LOTE_MAXIMO} chaves por consulta"}), 400
+    # Só texto ou inteiro: de qualquer outra coisa, str() inventaria uma chave
+    if not all(chave_valida(valor) for valor in registros_ans + cnpjs):
+        return jsonify({"erro": "As chaves devem ser textos ou números inteiros"}), 400
+    
+    snapshot = registro.obter()
+    posicoes = []
+    nao_encontrados = {"registros_ans": [], "cnpjs": []}
+    
+    for valor in registros_ans:
+        posicao = snapshot.posicao_registro_ans(valor)
+        if posicao is None:
+            nao_encontrados["registros_ans"].append(valor)
+        else:
+            posicoes.append(posicao)
+    
+    for valor in cnpjs:
+        posicao = snapshot.posicao_cnpj(valor)
+        if posicao is None:
+            nao_encontrados["cnpjs"].append(valor)
+        else:
+            posicoes.append(posicao)
+    
+    # Mesma operadora pedida por Registro ANS e por CNPJ aparece uma vez só
+    posicoes = list(dict.fromkeys(posicoes))
+    
+    return resposta_com_linhas({
+        "total_resultados": len(posicoes),
+        "nao_encontrados": nao_encontrados
+    }, snapshot.linhas(posicoes))
+
+# Rota com os contadores do cache de busca
+@app.route('/api/operadoras/cache', methods=['GET'])
+def api_estatisticas_cache():
+    return jsonify(cache_busca.estatisticas())
+
+# Consultas analíticas sobre o banco gerado por banco-de-dados/script2.py
+banco_analises = BancoAnalises()
+
+# Respostas analíticas já serializadas; a chave inclui a versão do banco,
+# então o fim de uma importação invalida as entradas antigas
+cache_analises = CacheLRU(max_entradas=1024, max_bytes=8 * 1024 * 1024, ttl=300.0)
+
+# Limites do ranking de despesas
+RANKING_PADRAO = 10
+RANKING_MAXIMO = 100
+
+# Responde com um corpo JSON guardado no cache de análises (ou calculado agora)
+def resposta_analise(chave, calcular):
+    corpo = cache_analises.obter(chave)
+    
+    if corpo is None:
+        try:
+            corpo = serializacao.dumps(calcular())
+        except BancoIndisponivel as e:
+            return jsonify({"erro": str(e)}), 503
+        cache_analises.guardar(chave, corpo, len(corpo))
+    
+    return Response(corpo, mimetype='application/json')
+
+# Rota de ranking: maiores despesas por categoria, período, UF e modalidade
+@app.route('/api/analises/maiores-despesas', methods=['GET'])
+def api_maiores_despesas():
+    categoria = request.args.get('categoria', '').strip() or CATEGORIA_PADRAO
+    uf = request.args.get('uf', '').strip().upper() or None
+    modalidade = request.args.get('modalidade', '').strip() or None
+    
+    try:
+        ano = ler_inteiro('ano', None)
+        trimestre = ler_inteiro('trimestre', None, 4)
+        limite = ler_inteiro('limit', RANKING_PADRAO, RANKING_MAXIMO)
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    
+    if trimestre == 0:
+        return jsonify({"erro": "Parâmetro 'trimestre' deve estar entre 1 e 4"}), 400
+    
+    def calcular():
+        ano_consultado, linhas = banco_analises.maiores_despesas(categoria, ano, trimestre, uf, modalidade, limite)
+        return {
+            "categoria": categoria,
+            "ano": ano_consultado,
+            "trimestre": trimestre,
+            "uf": uf,
+            "modalidade": modalidade,
+            "limite": limite,
+            "total_resultados": len(linhas),
+            "resultados": [
+                {"registro_ans": registro_ans, "razao_social": razao_social, "uf": uf_operadora,
+                 "modalidade": modalidade_operadora, "valor_despesa": valor}
+                for registro_ans, razao_social, uf_operadora, modalidade_operadora, valor in linhas
+            ]
+        }
+    
+    chave = ('maiores-despesas', banco_analises.versao(), categoria, ano, trimestre, uf, modalidade, limite)
+    return resposta_analise(chave, calcular)
+
+# Rota com as categorias de conta e os períodos disponíveis para o ranking
+@app.route('/api/analises/periodos', methods=['GET'])
+def api_periodos_analises():
+    def calcular():
+        return {
+            "categorias": banco_analises.categorias(),
+            "periodos": [{"ano": ano, "trimestre": trimestre} for ano, trimestre in banco_analises.periodos()]
+        }
+    
+    return resposta_analise(('periodos', banco_analises.versao()), calcular)
+
+# Rota com os contadores do cache de análises
+@app.route('/api/analises/cache', methods=['GET'])
+def api_estatisticas_cache_analises():
+    return jsonify(cache_analises.estatisticas())
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
\ No newline at end of file
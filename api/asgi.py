@@ -0,0 +1,128 @@
+"""Ponto de entrada ASGI da API (uvicorn, hypercorn ou gunicorn com UvicornWorker).
+
+As rotas continuam sendo do Flask, ou seja, síncronas: o event loop do
+servidor cuida das conexões e da leitura do corpo das requisições, e cada
+view roda numa thread de um pool próprio de API_THREADS threads. Cada
+worker atende, portanto, até API_THREADS requisições ao mesmo tempo, como
+o gthread; o ganho do ASGI é só não ocupar thread com conexões ociosas.
+
+O adaptador usa só os protocolos ASGI e WSGI: a chamada WSGI inteira roda
+no pool (loop.run_in_executor) e a resposta pronta é enviada pelo event
+loop. As respostas da API são JSON montado em memória, então juntar o
+corpo antes de enviar não custa nada a mais. (O WsgiToAsgi do asgiref não
+serve: ele roda o app numa única thread por processo.)
+
+Exemplo: uvicorn asgi:aplicacao --port 5000
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from app import app
+
+# Threads que executam as views do Flask em cada processo
+THREADS = int(os.environ.get('API_THREADS', 8))
+
+# Corpos de requisição maiores que isso (em bytes) vão para um arquivo temporário
+CORPO_EM_MEMORIA = 64 * 1024
+
+
+def montar_environ(scope, corpo):
+    """Environ WSGI (PEP 3333) de uma requisição HTTP do ASGI"""
+    script_name = scope.get('root_path', '').encode('utf8').decode('latin1')
+    path_info = scope['path'].encode('utf8').decode('latin1')
+    if path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    servidor = scope.get('server') or ('localhost', 80)
+
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': corpo,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+
+    for nome, valor in scope.get('headers', []):
+        nome = nome.decode('latin1')
+        if nome == 'content-length':
+            chave = 'CONTENT_LENGTH'
+        elif nome == 'content-type':
+            chave = 'CONTENT_TYPE'
+        else:
+            chave = 'HTTP_' + nome.upper().replace('-', '_')
+        valor = valor.decode('latin1')
+        # Cabeçalhos repetidos viram um só, separados por vírgula
+        environ[chave] = f'{environ[chave]},{valor}' if chave in environ else valor
+    return environ
+
+
+def executar_wsgi(aplicacao, environ):
+    """Roda numa thread do pool: chama o app WSGI e devolve (status, cabeçalhos, corpo)"""
+    inicio = []
+
+    def start_response(status, cabecalhos, exc_info=None):
+        # Nada foi enviado ainda, então uma segunda chamada (com exc_info) só substitui a primeira
+        inicio[:] = [status, cabecalhos]
+
+    saida = aplicacao(environ, start_response)
+    try:
+        corpo = b''.join(saida)
+    finally:
+        if hasattr(saida, 'close'):
+            saida.close()
+
+    status, cabecalhos = inicio
+    cabecalhos = [(nome.lower().encode('latin1'), valor.encode('latin1')) for nome, valor in cabecalhos]
+    return int(status.split(' ', 1)[0]), cabecalhos, corpo
+
+
+class AdaptadorWSGI:
+    """Aplicação ASGI que executa um app WSGI num pool de threads próprio"""
+
+    def __init__(self, wsgi_application, threads=THREADS):
+        self.wsgi_application = wsgi_application
+        # As threads só nascem na primeira requisição, então o pool pode ser
+        # criado no processo mestre antes do fork
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            raise ValueError(f"Adaptador WSGI recebeu um scope '{scope['type']}'")
+
+        with SpooledTemporaryFile(max_size=CORPO_EM_MEMORIA) as corpo:
+            while True:
+                mensagem = await receive()
+                if mensagem['type'] == 'http.disconnect':
+                    return
+                corpo.write(mensagem.get('body', b''))
+                if not mensagem.get('more_body'):
+                    break
+            corpo.seek(0)
+
+            laco = asyncio.get_running_loop()
+            status, cabecalhos, conteudo = await laco.run_in_executor(
+                self.executor, executar_wsgi, self.wsgi_application, montar_environ(scope, corpo))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': conteudo})
+
+
+def criar_aplicacao(threads=THREADS):
+    return AdaptadorWSGI(app, threads)
+
+
+aplicacao = criar_aplicacao()
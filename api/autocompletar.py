@@ -0,0 +1,88 @@
+import re
+from bisect import bisect_left
+
+from normalizacao import normalizar_coluna, normalizar_identificador, normalizar_texto
+
+# Colunas de texto sugeridas (prefixo do valor inteiro ou de qualquer palavra)
+COLUNAS_TEXTO = ['Razao_Social', 'Nome_Fantasia', 'Cidade']
+
+# Colunas numéricas sugeridas (prefixo dos dígitos)
+COLUNAS_NUMERICAS = ['Registro_ANS', 'CNPJ']
+
+_NAO_DIGITOS = re.compile(r'\D')
+_TERMO_NUMERICO = re.compile(r'^[\d.\-/ ]+$')
+
+
+class IndiceAutocompletar:
+    """Índice de prefixos em arrays ordenados para sugestões de digitação.
+
+    Cada sugestão distinta (coluna, valor) é guardada uma vez. As chaves
+    normalizadas ficam em duas listas ordenadas: uma com o valor inteiro e
+    outra com o valor a partir de cada palavra seguinte. A consulta faz um
+    bisect no prefixo e percorre só até juntar as N primeiras sugestões,
+    dando preferência a quem começa pelo termo.
+    """
+
+    def __init__(self, df):
+        self.sugestoes = []
+        chaves_valor = []
+        chaves_palavra = []
+        vistas = set()
+
+        registros = df['Registro_ANS'].tolist() if 'Registro_ANS' in df.columns else [None] * len(df)
+
+        for coluna in COLUNAS_TEXTO + COLUNAS_NUMERICAS:
+            if coluna not in df.columns:
+                continue
+            numerica = coluna in COLUNAS_NUMERICAS
+            valores = df[coluna].tolist()
+            if numerica:
+                normalizados = [normalizar_identificador(valor) for valor in valores]
+            else:
+                normalizados = normalizar_coluna(df[coluna])
+
+            for valor, normalizado, registro_ans in zip(valores, normalizados, registros):
+                if not normalizado or (coluna, normalizado) in vistas:
+                    continue
+
+                indice = len(self.sugestoes)
+                vistas.add((coluna, normalizado))
+                # Registro ANS só faz sentido para sugestões que apontam para uma operadora
+                self.sugestoes.append((coluna, valor, registro_ans if coluna != 'Cidade' else None))
+                chaves_valor.append((normalizado, indice))
+
+                if not numerica:
+                    palavras = normalizado.split(' ')
+                    for inicio in range(1, len(palavras)):
+                        chaves_palavra.append((' '.join(palavras[inicio:]), indice))
+
+        chaves_valor.sort()
+        chaves_palavra.sort()
+        self.chaves_valor = [chave for chave, _ in chaves_valor]
+        self.ids_valor = [indice for _, indice in chaves_valor]
+        self.chaves_palavra = [chave for chave, _ in chaves_palavra]
+        self.ids_palavra = [indice for _, indice in chaves_palavra]
+
+    @staticmethod
+    def _varrer(chaves, ids, prefixo, limite, escolhidos):
+        inicio = bisect_left(chaves, prefixo)
+        for posicao in range(inicio, len(chaves)):
+            if len(escolhidos) >= limite or not chaves[posicao].startswith(prefixo):
+                break
+            if ids[posicao] not in escolhidos:
+                escolhidos[ids[posicao]] = None
+
+    def sugerir(self, termo, limite=10):
+        """Devolve até `limite` sugestões (coluna, valor, registro_ans) para o prefixo"""
+        if _TERMO_NUMERICO.match(termo):
+            prefixo = _NAO_DIGITOS.sub('', termo)
+        else:
+            prefixo = normalizar_texto(termo)
+        if not prefixo:
+            return []
+
+        escolhidos = {}  # dict preserva a ordem de inserção
+        self._varrer(self.chaves_valor, self.ids_valor, prefixo, limite, escolhidos)
+        self._varrer(self.chaves_palavra, self.ids_palavra, prefixo, limite, escolhidos)
+
+        return [self.sugestoes[indice] for indice in escolhidos]
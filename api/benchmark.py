@@ -0,0 +1,341 @@
+"""Benchmark de carga e vazão da API de operadoras.
+
+Uso (dentro de api/):
+    python benchmark.py                                  # test client, escalas 1x, 10x e 100x
+    python benchmark.py --escalas 1 10 --requisicoes 5000
+    python benchmark.py --http http://127.0.0.1:5000 --concorrencia 16 --pid <pid do servidor>
+    python benchmark.py --comparar resultado_antigo.json
+
+Nenhuma rede externa é usada: o modo padrão usa o test client do Flask e
+o modo --http só fala com um servidor local já em execução. Os cadastros
+sintéticos replicam o Relatorio_cadop.csv com identificadores únicos.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+# Termos populares (a maior parte do tráfego real se concentra em poucos nomes e cidades)
+TERMOS_POPULARES = ['unimed', 'sao paulo', 'odonto', 'saude', 'rio de janeiro', 'amil', 'belo horizonte']
+
+# Peso de cada tipo de requisição na mistura
+MISTURA = [
+    ('buscar_popular', 40),
+    ('buscar_cauda', 20),
+    ('autocomplete', 25),
+    ('registro_ans', 10),
+    ('buscar_pagina', 5),
+]
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return 0.0
+    posicao = min(len(valores_ordenados) - 1, int(round(p / 100 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[posicao]
+
+
+def resumir_latencias(latencias):
+    ordenadas = sorted(latencias)
+    return {
+        "p50": percentil(ordenadas, 50) * 1000,
+        "p95": percentil(ordenadas, 95) * 1000,
+        "p99": percentil(ordenadas, 99) * 1000,
+        "media": sum(ordenadas) / len(ordenadas) * 1000 if ordenadas else 0.0,
+        "max": ordenadas[-1] * 1000 if ordenadas else 0.0,
+    }
+
+
+def rss_pico_mb():
+    """Pico de memória residente do processo atual (ru_maxrss é KB no Linux e bytes no macOS)"""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+def processos_descendentes(pid):
+    """O processo e todos os seus descendentes (mestre e workers do gunicorn), pelo /proc do Linux"""
+    processos = [pid]
+    for processo in processos:
+        for tarefa in os.listdir(f'/proc/{processo}/task'):
+            try:
+                with open(f'/proc/{processo}/task/{tarefa}/children', encoding='ascii') as f:
+                    processos.extend(int(filho) for filho in f.read().split())
+            except FileNotFoundError:  # thread que terminou no meio da leitura
+                pass
+    return processos
+
+
+def rss_pico_processo_mb(pid):
+    """Pico de memória residente (VmHWM) de outro processo, desde que ele começou"""
+    with open(f'/proc/{pid}/status', encoding='ascii') as f:
+        for linha in f:
+            if linha.startswith('VmHWM:'):
+                return int(linha.split()[1]) / 1024  # em kB
+    return 0.0
+
+
+def gerar_cadastro_sintetico(caminho_origem, escala, destino):
+    """Replica as linhas do CSV `escala` vezes, trocando Registro ANS e CNPJ para continuarem únicos"""
+    with open(caminho_origem, 'r', encoding='utf-8') as f:
+        cabecalho = f.readline()
+        linhas = f.readlines()
+
+    colunas = cabecalho.rstrip('\n').split(';')
+    pos_registro = colunas.index('Registro_ANS')
+    pos_cnpj = colunas.index('CNPJ')
+
+    with open(destino, 'w', encoding='utf-8') as f:
+        f.write(cabecalho)
+        for copia in range(escala):
+            for numero, linha in enumerate(linhas):
+                campos = linha.rstrip('\n').split(';')
+                if copia:
+                    sequencial = copia * len(linhas) + numero
+                    campos[pos_registro] = f'"{900000 + sequencial}"'
+                    campos[pos_cnpj] = f'"{sequencial:014d}"'
+                f.write(';'.join(campos) + '\n')
+
+
+def montar_requisicoes(snapshot, quantidade, semente):
+    """Gera uma lista reprodutível de (tipo, caminho) seguindo a MISTURA"""
+    aleatorio = random.Random(semente)
+    df = snapshot.df
+
+    palavras = sorted({palavra for nome in df['Razao_Social'].dropna().tolist()
+                       for palavra in nome.split() if len(palavra) >= 4})
+    registros = df['Registro_ANS'].dropna().tolist()
+    nomes = df['Razao_Social'].dropna().tolist()
+
+    tipos = [tipo for tipo, _ in MISTURA]
+    pesos = [peso for _, peso in MISTURA]
+    # Distribuição tipo Zipf sobre os termos populares
+    pesos_populares = [1 / (posicao + 1) for posicao in range(len(TERMOS_POPULARES))]
+
+    requisicoes = []
+    for _ in range(quantidade):
+        tipo = aleatorio.choices(tipos, pesos)[0]
+        if tipo == 'buscar_popular':
+            termo = aleatorio.choices(TERMOS_POPULARES, pesos_populares)[0]
+            caminho = '/api/operadoras/buscar?' + urllib.parse.urlencode({'q': termo})
+        elif tipo == 'buscar_cauda':
+            caminho = '/api/operadoras/buscar?' + urllib.parse.urlencode({'q': aleatorio.choice(palavras)})
+        elif tipo == 'autocomplete':
+            nome = aleatorio.choice(nomes)
+            prefixo = nome[:aleatorio.randint(2, min(8, len(nome)))]
+            caminho = '/api/operadoras/autocomplete?' + urllib.parse.urlencode({'q': prefixo})
+        elif tipo == 'registro_ans':
+            caminho = f'/api/operadoras/{aleatorio.choice(registros)}'
+        else:
+            termo = aleatorio.choice(TERMOS_POPULARES)
+            caminho = '/api/operadoras/buscar?' + urllib.parse.urlencode(
+                {'q': termo, 'limit': 50, 'offset': aleatorio.choice([0, 50, 100])})
+        requisicoes.append((tipo, caminho))
+    return requisicoes
+
+
+def resumir(latencias_por_tipo, duracao, erros):
+    todas = [latencia for latencias in latencias_por_tipo.values() for latencia in latencias]
+    return {
+        "requisicoes": len(todas),
+        "erros": erros,
+        "duracao_s": duracao,
+        "throughput_rps": len(todas) / duracao if duracao else 0.0,
+        "latencia_ms": resumir_latencias(todas),
+        "por_tipo": {tipo: dict(resumir_latencias(latencias), requisicoes=len(latencias))
+                     for tipo, latencias in sorted(latencias_por_tipo.items())},
+    }
+
+
+def medir_escala(escala, quantidade, semente, usar_cache):
+    """Executa a mistura com o test client sobre um cadastro `escala` vezes maior (roda em processo próprio)"""
+    import app as modulo_app
+    from cache import CacheLRU
+    from registro import CAMINHO_CSV, RegistroOperadoras
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = CAMINHO_CSV
+        if escala > 1:
+            caminho = os.path.join(diretorio, f'cadop_{escala}x.csv')
+            gerar_cadastro_sintetico(CAMINHO_CSV, escala, caminho)
+
+        inicio = time.perf_counter()
+        modulo_app.registro = RegistroOperadoras(caminho)
+        snapshot = modulo_app.registro.carregar()
+        tempo_carga = time.perf_counter() - inicio
+
+    if not usar_cache:
+        modulo_app.cache_busca = CacheLRU(max_entradas=0)
+
+    requisicoes = montar_requisicoes(snapshot, quantidade, semente)
+    cliente = modulo_app.app.test_client()
+
+    # Aquecimento fora da medição
+    for _, caminho in requisicoes[:50]:
+        cliente.get(caminho)
+
+    latencias_por_tipo = {}
+    erros = 0
+    inicio = time.perf_counter()
+    for tipo, caminho in requisicoes:
+        antes = time.perf_counter()
+        resposta = cliente.get(caminho)
+        latencias_por_tipo.setdefault(tipo, []).append(time.perf_counter() - antes)
+        if resposta.status_code >= 500:
+            erros += 1
+    duracao = time.perf_counter() - inicio
+
+    resultado = resumir(latencias_por_tipo, duracao, erros)
+    resultado.update({
+        "escala": escala,
+        "linhas": len(snapshot.df),
+        "tempo_carga_s": tempo_carga,
+        "rss_pico_mb": rss_pico_mb(),
+        "cache": modulo_app.cache_busca.estatisticas(),
+    })
+    return resultado
+
+
+def medir_http(url_base, quantidade, semente, concorrencia, pids=()):
+    """Executa a mistura contra um servidor local já em execução, com várias threads.
+
+    A memória do servidor só é medida com os `pids` dele (e dos seus
+    descendentes): o pico de cada processo sai do /proc ao fim da carga.
+    """
+    from registro import RegistroOperadoras
+
+    snapshot = RegistroOperadoras().carregar()
+    requisicoes = montar_requisicoes(snapshot, quantidade, semente)
+
+    latencias_por_tipo = {}
+    erros = [0]
+    lock = threading.Lock()
+
+    def executar(requisicao):
+        tipo, caminho = requisicao
+        antes = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url_base.rstrip('/') + caminho, timeout=30) as resposta:
+                resposta.read()
+            falhou = False
+        except urllib.error.HTTPError as e:
+            falhou = e.code >= 500
+        except OSError:
+            falhou = True
+        latencia = time.perf_counter() - antes
+        with lock:
+            latencias_por_tipo.setdefault(tipo, []).append(latencia)
+            erros[0] += falhou
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(executar, requisicoes))
+    duracao = time.perf_counter() - inicio
+
+    resultado = resumir(latencias_por_tipo, duracao, erros[0])
+    resultado.update({"url": url_base, "concorrencia": concorrencia, "rss_pico_mb_cliente": rss_pico_mb()})
+
+    # A soma dos picos é um teto: as páginas compartilhadas por copy-on-write
+    # entre os workers contam uma vez por processo, e os picos podem não coincidir
+    processos = [processo for pid in pids for processo in processos_descendentes(pid)]
+    por_processo = {str(processo): rss_pico_processo_mb(processo) for processo in processos}
+    resultado.update({
+        "rss_pico_mb_servidor": sum(por_processo.values()) if processos else None,
+        "rss_pico_mb_servidor_por_processo": por_processo,
+    })
+    return resultado
+
+
+def imprimir(resultado):
+    latencia = resultado['latencia_ms']
+    rotulo = f"{resultado['escala']}x ({resultado['linhas']} linhas)" if 'escala' in resultado else resultado['url']
+    if 'escala' in resultado:
+        memoria = f"RSS pico {resultado['rss_pico_mb']:.0f} MB"
+    elif resultado['rss_pico_mb_servidor'] is not None:
+        memoria = (f"RSS pico servidor {resultado['rss_pico_mb_servidor']:.0f} MB "
+                   f"({len(resultado['rss_pico_mb_servidor_por_processo'])} processos)")
+    else:
+        memoria = "RSS do servidor não medido (use --pid)"
+    print(f"{rotulo}: {resultado['throughput_rps']:.0f} req/s | "
+          f"p50 {latencia['p50']:.2f} ms | p95 {latencia['p95']:.2f} ms | p99 {latencia['p99']:.2f} ms | "
+          f"{memoria} | erros {resultado['erros']}")
+
+
+def comparar(arquivo_anterior, atual):
+    """Mostra a variação de vazão e p99 em relação a uma execução anterior"""
+    with open(arquivo_anterior, 'r', encoding='utf-8') as f:
+        anterior = json.load(f)
+
+    chave = lambda r: r.get('escala', r.get('url'))
+    anteriores = {chave(r): r for r in anterior['resultados']}
+
+    print(f"\nComparação com {arquivo_anterior}:")
+    for resultado in atual['resultados']:
+        base = anteriores.get(chave(resultado))
+        if base is None:
+            continue
+        variacao_rps = (resultado['throughput_rps'] / base['throughput_rps'] - 1) * 100 if base['throughput_rps'] else 0.0
+        variacao_p99 = (resultado['latencia_ms']['p99'] / base['latencia_ms']['p99'] - 1) * 100 if base['latencia_ms']['p99'] else 0.0
+        print(f"  {chave(resultado)}: vazão {variacao_rps:+.1f}% | p99 {variacao_p99:+.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de carga da API de operadoras')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10, 100],
+                        help='multiplicadores do cadastro (1 = Relatorio_cadop.csv original)')
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--sem-cache', action='store_true', help='desliga o cache de resultados da busca')
+    parser.add_argument('--http', metavar='URL', help='mede um servidor local em execução em vez do test client')
+    parser.add_argument('--concorrencia', type=int, default=8, help='threads do gerador de carga no modo --http')
+    parser.add_argument('--pid', type=int, nargs='+', default=[],
+                        help='no modo --http, PID do servidor (o mestre basta: os workers entram junto) '
+                             'para medir o pico de RSS dele')
+    parser.add_argument('--saida', help='arquivo JSON de saída (padrão: benchmark_<data>.json)')
+    parser.add_argument('--comparar', metavar='JSON', help='resultado anterior para comparação')
+    args = parser.parse_args()
+
+    resultados = []
+    if args.http:
+        resultado = medir_http(args.http, args.requisicoes, args.semente, args.concorrencia, args.pid)
+        imprimir(resultado)
+        resultados.append(resultado)
+    else:
+        # Cada escala roda em um processo novo para que o pico de RSS seja só dela
+        contexto = multiprocessing.get_context('spawn')
+        for escala in args.escalas:
+            with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as executor:
+                resultado = executor.submit(medir_escala, escala, args.requisicoes,
+                                            args.semente, not args.sem_cache).result()
+            imprimir(resultado)
+            resultados.append(resultado)
+
+    relatorio = {
+        "data": datetime.now().isoformat(timespec='seconds'),
+        "modo": 'http' if args.http else 'test_client',
+        "requisicoes": args.requisicoes,
+        "semente": args.semente,
+        "cache": not args.sem_cache,
+        "resultados": resultados,
+    }
+
+    saida = args.saida or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados salvos em {saida}")
+
+    if args.comparar:
+        comparar(args.comparar, relatorio)
+
+
+if __name__ == '__main__':
+    main()
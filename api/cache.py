@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLRU:
+    """Cache em memória com despejo LRU, limite de tamanho e expiração por TTL.
+
+    O tamanho de cada entrada é informado por quem grava (por exemplo, o
+    número de bytes das linhas JSON), de forma que o limite vale para a
+    memória ocupada, não só para a quantidade de entradas.
+    """
+
+    def __init__(self, max_entradas=1024, max_bytes=32 * 1024 * 1024, ttl=300.0):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # chave -> (expira_em, tamanho, valor)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0
+        self.expirados = 0
+
+    def obter(self, chave):
+        """Devolve o valor em cache ou None"""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.falhas += 1
+                return None
+
+            expira_em, tamanho, valor = entrada
+            if expira_em < time.monotonic():
+                del self._entradas[chave]
+                self._bytes -= tamanho
+                self.expirados += 1
+                self.falhas += 1
+                return None
+
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave, valor, tamanho=0):
+        """Grava o valor, despejando as entradas menos usadas se passar dos limites"""
+        if tamanho > self.max_bytes:
+            return
+
+        with self._lock:
+            anterior = self._entradas.pop(chave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+
+            self._entradas[chave] = (time.monotonic() + self.ttl, tamanho, valor)
+            self._bytes += tamanho
+
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamanho_despejado, _) = self._entradas.popitem(last=False)
+                self._bytes -= tamanho_despejado
+                self.despejos += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "despejos": self.despejos,
+                "expirados": self.expirados,
+                "taxa_acerto": self.acertos / consultas if consultas else 0.0
+            }
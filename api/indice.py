@@ -0,0 +1,95 @@
+import heapq
+from collections import defaultdict
+
+import numpy as np
+
+from normalizacao import normalizar_coluna
+
+# Tamanho dos n-gramas indexados
+TAMANHO_NGRAMA = 3
+
+# Separador entre colunas no texto de cada registro (impede n-gramas entre colunas)
+SEPARADOR = '\x00'
+
+
+def gerar_ngramas(texto, n=TAMANHO_NGRAMA):
+    """Devolve o conjunto de n-gramas de um texto"""
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceNgramas:
+    """Índice invertido de trigramas sobre o texto de todas as colunas do cadastro.
+
+    Cada registro vira uma única string, já normalizada (ver normalizacao.py),
+    com as colunas separadas por SEPARADOR. A normalização acontece uma vez
+    por registro na carga; a busca só normaliza o termo.
+
+    A busca intersecta as listas de postagem dos trigramas do termo e só
+    então confirma a substring nos candidatos, que costumam ser poucos.
+    """
+
+    def __init__(self, df):
+        self.textos = self._textos_registros(df)
+        self.postagens = self._construir_postagens(self.textos)
+
+    @staticmethod
+    def _textos_registros(df):
+        if df.empty:
+            return []
+        colunas = [normalizar_coluna(df[coluna]) for coluna in df.columns]
+        return [SEPARADOR.join(valores) for valores in zip(*colunas)]
+
+    @staticmethod
+    def _construir_postagens(textos):
+        postagens = defaultdict(list)
+        for posicao, texto in enumerate(textos):
+            for ngrama in gerar_ngramas(texto):
+                postagens[ngrama].append(posicao)
+        return {ngrama: np.array(posicoes, dtype=np.int32) for ngrama, posicoes in postagens.items()}
+
+    def _candidatos(self, termo):
+        """Posições que contêm todos os trigramas do termo (ou todas, se o termo for curto)"""
+        if len(termo) < TAMANHO_NGRAMA:
+            return range(len(self.textos))
+
+        listas = []
+        for ngrama in gerar_ngramas(termo):
+            lista = self.postagens.get(ngrama)
+            if lista is None:
+                return []
+            listas.append(lista)
+
+        listas.sort(key=len)
+        candidatos = listas[0]
+        for lista in listas[1:]:
+            candidatos = np.intersect1d(candidatos, lista, assume_unique=True)
+            if len(candidatos) == 0:
+                break
+        return candidatos.tolist()
+
+    def buscar(self, termo, limite=None, deslocamento=0):
+        """Devolve (total, posições) dos registros que contêm o termo normalizado.
+
+        A relevância é o número de ocorrências do termo somado em todas as
+        colunas; as posições vêm ordenadas por relevância decrescente,
+        mantendo a ordem original do arquivo em caso de empate. Com limite,
+        só os deslocamento + limite melhores são selecionados (heap), sem
+        ordenar todos os resultados.
+        """
+        termo = termo.replace(SEPARADOR, '')
+        if not termo:
+            return 0, []
+
+        textos = self.textos
+        ocorrencias = []
+        for posicao in self._candidatos(termo):
+            contagem = textos[posicao].count(termo)
+            if contagem:
+                ocorrencias.append((-contagem, posicao))
+
+        if limite is None:
+            selecionados = sorted(ocorrencias)[deslocamento:]
+        else:
+            selecionados = heapq.nsmallest(deslocamento + limite, ocorrencias)[deslocamento:]
+
+        return len(ocorrencias), [posicao for _, posicao in selecionados]
@@ -0,0 +1,44 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+_ESPACOS = re.compile(r'\s+')
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def normalizar_texto(texto):
+    """Normaliza um texto para busca: NFKD, sem acentos, casefold e espaços colapsados"""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return _ESPACOS.sub(' ', sem_acentos.casefold()).strip()
+
+
+def normalizar_identificador(valor, tamanho=None):
+    """Dígitos de um identificador (Registro ANS, CNPJ), lidos como número ou texto.
+
+    Com `tamanho`, completa com zeros à esquerda (CNPJ tem sempre 14 dígitos).
+    """
+    if valor is None:
+        return ''
+    if isinstance(valor, float):
+        if valor != valor:  # NaN
+            return ''
+        valor = int(valor)
+    digitos = _NAO_DIGITOS.sub('', str(valor))
+    if digitos and tamanho:
+        digitos = digitos.zfill(tamanho)
+    return digitos
+
+
+def normalizar_coluna(serie):
+    """Normaliza uma coluna inteira, processando cada valor distinto uma única vez.
+
+    Valores ausentes viram string vazia. Como colunas como Cidade, UF e
+    Modalidade repetem muito, normalizar só os valores distintos e expandir
+    pelos códigos do factorize custa bem menos do que um map célula a célula.
+    """
+    codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+    normalizados = [normalizar_texto(str(valor)) for valor in unicos]
+    normalizados.append('')  # posição -1 (valores ausentes)
+    return [normalizados[codigo] for codigo in codigos]
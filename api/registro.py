@@ -0,0 +1,167 @@
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+# Detecção de formato dos CSVs compartilhada com a importação do banco (pasta comum/ na raiz)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serializacao
+from autocompletar import IndiceAutocompletar
+from comum.formato_csv import ERROS_ENCODING, detectar_formato
+from indice import IndiceNgramas
+from normalizacao import normalizar_identificador
+
+# Caminho padrão do cadastro de operadoras (relativo a este arquivo, não ao cwd)
+CAMINHO_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'Relatorio_cadop.csv')
+
+# Identificadores lidos como texto para não perder zeros à esquerda
+COLUNAS_IDENTIFICADORES = {'Registro_ANS': str, 'CNPJ': str}
+
+# Quantidade de dígitos do CNPJ (chaves do índice são completadas com zeros)
+DIGITOS_CNPJ = 14
+
+# Intervalo mínimo (em segundos) entre duas verificações do mtime do arquivo
+INTERVALO_VERIFICACAO = 1.0
+
+
+def carregar_dados_operadoras(caminho_csv=CAMINHO_CSV):
+    """Lê o CSV de operadoras uma única vez e devolve o DataFrame"""
+    try:
+        # Encoding e delimitador saem de uma amostra do início do arquivo,
+        # guardados pela impressão do arquivo (mtime e tamanho)
+        encoding, delimitador, _ = detectar_formato(caminho_csv)
+        df = pd.read_csv(caminho_csv,
+                         encoding=encoding,
+                         encoding_errors=ERROS_ENCODING,
+                         delimiter=delimitador,
+                         dtype=COLUNAS_IDENTIFICADORES,
+                         on_bad_lines='skip')  # Ignora linhas problemáticas
+        print(f"CSV carregado ({encoding}, delimitador '{delimitador}'): {len(df)} linhas.")
+        return df
+    except Exception as e:
+        print(f"Erro ao carregar CSV: {e}")
+        import traceback
+        traceback.print_exc()
+        return pd.DataFrame()
+
+
+class SnapshotOperadoras:
+    """Versão imutável do cadastro carregado em memória, com seus índices"""
+
+    def __init__(self, df, mtime, versao):
+        self.df = df
+        self.mtime = mtime
+        self.versao = versao
+        self.indice = IndiceNgramas(df)
+        self.autocompletar = IndiceAutocompletar(df)
+        self.por_registro_ans = self._indice_exato(df, 'Registro_ANS')
+        self.por_cnpj = self._indice_exato(df, 'CNPJ', DIGITOS_CNPJ)
+        # Cada registro é convertido e serializado uma única vez por snapshot
+        self.registros = serializacao.registros_para_dicts(df)
+        self.linhas_json = serializacao.renderizar_registros(self.registros)
+
+    @staticmethod
+    def _indice_exato(df, coluna, tamanho=None):
+        """Dicionário identificador -> posição (a primeira ocorrência prevalece)"""
+        indice = {}
+        if coluna not in df.columns:
+            return indice
+        for posicao, valor in enumerate(df[coluna].tolist()):
+            chave = normalizar_identificador(valor, tamanho)
+            if chave:
+                indice.setdefault(chave, posicao)
+        return indice
+
+    @property
+    def vazio(self):
+        return self.df.empty
+
+    def posicao_registro_ans(self, registro_ans):
+        return self.por_registro_ans.get(normalizar_identificador(registro_ans))
+
+    def posicao_cnpj(self, cnpj):
+        return self.por_cnpj.get(normalizar_identificador(cnpj, DIGITOS_CNPJ))
+
+    def linhas(self, posicoes, campos=None):
+        """Devolve as linhas JSON dos registros nas posições pedidas, opcionalmente projetadas"""
+        if not campos:
+            return [self.linhas_json[posicao] for posicao in posicoes]
+        registros = self.registros
+        return [serializacao.dumps({campo: registros[posicao][campo] for campo in campos})
+                for posicao in posicoes]
+
+
+class RegistroOperadoras:
+    """Mantém o cadastro de operadoras em memória durante toda a vida do processo.
+
+    O CSV é lido uma vez na inicialização e relido apenas quando o mtime do
+    arquivo muda. A troca do snapshot é uma atribuição de referência, então
+    cada busca trabalha sobre uma versão consistente mesmo durante a recarga.
+    """
+
+    def __init__(self, caminho_csv=CAMINHO_CSV, intervalo_verificacao=INTERVALO_VERIFICACAO):
+        self.caminho_csv = caminho_csv
+        self.intervalo_verificacao = intervalo_verificacao
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._ultima_verificacao = 0.0
+        self._mtime_falho = None
+
+    def _mtime_arquivo(self):
+        try:
+            return os.stat(self.caminho_csv).st_mtime_ns
+        except OSError:
+            return None
+
+    def carregar(self):
+        """Lê o arquivo e publica um novo snapshot"""
+        with self._lock:
+            return self._recarregar(self._mtime_arquivo())
+
+    def _recarregar(self, mtime):
+        df = carregar_dados_operadoras(self.caminho_csv)
+        self._ultima_verificacao = time.monotonic()
+
+        # CSV truncado ou sendo gravado: segue com o snapshot anterior. O mtime
+        # que falhou fica guardado, e só uma nova alteração do arquivo (que a
+        # gravação em andamento vai produzir) dispara outra tentativa
+        if df.empty and self._snapshot is not None and not self._snapshot.vazio:
+            print("Recarga do CSV falhou; mantendo o cadastro anterior.")
+            self._mtime_falho = mtime
+            return self._snapshot
+
+        self._mtime_falho = None
+
+        versao = self._snapshot.versao + 1 if self._snapshot is not None else 1
+        snapshot = SnapshotOperadoras(df, mtime, versao)
+        self._snapshot = snapshot
+        return snapshot
+
+    def obter(self):
+        """Devolve o snapshot atual, recarregando se o arquivo mudou"""
+        snapshot = self._snapshot
+
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    return self._recarregar(self._mtime_arquivo())
+                return self._snapshot
+
+        agora = time.monotonic()
+        if agora - self._ultima_verificacao < self.intervalo_verificacao:
+            return snapshot
+
+        # Só uma thread recarrega; as demais seguem com o snapshot anterior
+        if not self._lock.acquire(blocking=False):
+            return snapshot
+        try:
+            self._ultima_verificacao = agora
+            mtime = self._mtime_arquivo()
+            if mtime is not None and mtime not in (self._snapshot.mtime, self._mtime_falho):
+                return self._recarregar(mtime)
+            return self._snapshot
+        finally:
+            self._lock.release()
@@ -0,0 +1,77 @@
+import json
+import os
+
+from flask import Response
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da biblioteca padrão
+    orjson = None
+
+
+def _dumps_stdlib(obj):
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _dumps_orjson(obj):
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY, default=str)
+
+
+# Serializadores disponíveis: recebem um objeto e devolvem bytes UTF-8
+SERIALIZADORES = {'stdlib': _dumps_stdlib}
+if orjson is not None:
+    SERIALIZADORES['orjson'] = _dumps_orjson
+
+
+def escolher_serializador(nome=None):
+    """Escolhe o serializador pelo nome (ou pela variável API_SERIALIZADOR)"""
+    nome = nome or os.environ.get('API_SERIALIZADOR') or ('orjson' if orjson is not None else 'stdlib')
+    if nome not in SERIALIZADORES:
+        raise ValueError(f"Serializador '{nome}' indisponível. Opções: {', '.join(SERIALIZADORES)}")
+    return SERIALIZADORES[nome]
+
+
+dumps = escolher_serializador()
+
+
+def definir_serializador(nome):
+    """Troca o serializador usado pelo módulo (vale para os próximos snapshots e respostas)"""
+    global dumps
+    dumps = escolher_serializador(nome)
+
+
+class ProvedorJSON(JSONProvider):
+    """Provider do Flask que faz jsonify usar o mesmo serializador da API"""
+
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return Response(dumps(obj), mimetype=self.mimetype)
+
+
+def registros_para_dicts(df):
+    """Converte o DataFrame em uma lista de dicts com tipos nativos e None no lugar de NaN"""
+    if df.empty:
+        return []
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def renderizar_registros(registros):
+    """Serializa cada registro uma única vez; o resultado é reaproveitado por todas as respostas"""
+    return [dumps(registro) for registro in registros]
+
+
+def resposta_com_linhas(metadados, linhas, chave='resultados', status=200):
+    """Monta a resposta JSON juntando linhas já serializadas, sem recodificá-las"""
+    cabecalho = dumps(metadados)[:-1]  # remove o '}' final para acrescentar a lista
+    separador = b',' if metadados else b''
+    corpo = b''.join([cabecalho, separador, dumps(chave), b':[', b','.join(linhas), b']}'])
+    return Response(corpo, status=status, mimetype='application/json')
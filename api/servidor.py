@@ -0,0 +1,102 @@
+"""Servidor de produção da API de operadoras.
+
+Uso:
+    python servidor.py --workers 4 --porta 5000            # WSGI (gthread)
+    python servidor.py --workers 4 --modo asgi             # ASGI (uvicorn + pool de threads)
+
+O app (e o cadastro em memória) é carregado uma vez no processo mestre,
+antes do fork; os workers herdam o snapshot por copy-on-write em vez de
+cada um ler e indexar o CSV de novo.
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+
+try:
+    from gunicorn.app.base import BaseApplication
+except ImportError:  # gunicorn é opcional; sem ele só o servidor de desenvolvimento funciona
+    BaseApplication = None
+
+
+def workers_padrao():
+    return int(os.environ.get('API_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+
+
+def criar_aplicacao(modo, threads):
+    """Importa o app Flask (carregando o cadastro) e devolve a aplicação no modo pedido"""
+    from app import app
+
+    if modo == 'asgi':
+        from asgi import criar_aplicacao as criar_aplicacao_asgi
+        return criar_aplicacao_asgi(threads)
+    return app
+
+
+def congelar_heap(servidor):
+    """Move os objetos já carregados para a geração permanente do GC antes do fork.
+
+    Sem isso, as coletas do GC nos workers tocam os cabeçalhos dos objetos
+    do snapshot e forçam a cópia das páginas que deveriam ser compartilhadas.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+if BaseApplication is not None:
+    class ServidorGunicorn(BaseApplication):
+        """Gunicorn embutido, configurado por código em vez de arquivo"""
+
+        def __init__(self, aplicacao, opcoes):
+            self.aplicacao = aplicacao
+            self.opcoes = opcoes
+            super().__init__()
+
+        def load_config(self):
+            for chave, valor in self.opcoes.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            return self.aplicacao
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor de produção da API de operadoras')
+    parser.add_argument('--host', default=os.environ.get('API_HOST', '0.0.0.0'))
+    parser.add_argument('--porta', type=int, default=int(os.environ.get('API_PORTA', 5000)))
+    parser.add_argument('--workers', type=int, default=workers_padrao())
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('API_THREADS', 8)),
+                        help='threads por worker (requisições simultâneas por worker, nos dois modos)')
+    parser.add_argument('--modo', choices=['wsgi', 'asgi'], default=os.environ.get('API_MODO', 'wsgi'))
+    parser.add_argument('--timeout', type=int, default=30)
+    args = parser.parse_args()
+
+    if BaseApplication is None:
+        print("gunicorn não está instalado. Instale com 'pip install gunicorn' "
+              "(e 'uvicorn' para o modo asgi) ou use 'python app.py' em desenvolvimento.")
+        sys.exit(1)
+
+    opcoes = {
+        'bind': f"{args.host}:{args.porta}",
+        'workers': args.workers,
+        'timeout': args.timeout,
+        'preload_app': True,
+        'when_ready': congelar_heap,
+    }
+
+    if args.modo == 'asgi':
+        # Event loop por worker para as conexões; as views rodam num pool de
+        # --threads threads (ver asgi.py), como no gthread
+        opcoes['worker_class'] = 'uvicorn.workers.UvicornWorker'
+    else:
+        # Threads por worker: uma conexão lenta ocupa uma thread, não o worker todo
+        opcoes['worker_class'] = 'gthread'
+        opcoes['threads'] = args.threads
+
+    print(f"Iniciando servidor {args.modo.upper()} em {opcoes['bind']} com {args.workers} workers...")
+    ServidorGunicorn(criar_aplicacao(args.modo, args.threads), opcoes).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import os
-import urllib.request
 import pandas as pd
 import sqlite3
 from datetime import datetime
@@ -8,10 +7,168 @@ import io
 import re
 import ssl
 import sys
+import time
+import hashlib
+import queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import repeat
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from pyarrow.fs import LocalFileSystem
+except ImportError:  # pyarrow é opcional; sem ele limpar_valores usa limpar_valor célula a célula
+    pa = None        # e o armazenamento Parquet fica indisponível
+
+# Downloads e detecção de formato dos CSVs compartilhados (pasta comum/ na raiz do repositório)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.download import NAO_MODIFICADO, baixar
+from comum.formato_csv import ERROS_ENCODING, detectar_formato, mapear_colunas
 
 # Configuração para ignorar erros de certificado SSL
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# Onde as demonstrações ficam guardadas: 'sqlite' (padrão) ou 'parquet'
+ARMAZENAMENTO = os.environ.get('ANS_ARMAZENAMENTO', 'sqlite')
+
+# Partições Parquet (ano=AAAA/trimestre=T) do armazenamento colunar
+DIRETORIO_PARQUET = 'dados_ans/parquet/demonstracoes_contabeis'
+
+# Linhas por lote na importação em streaming (limita a memória usada por arquivo)
+TAMANHO_LOTE = 100_000
+
+# Com pyarrow, o saldo é lido direto em strings do Arrow, que limpar_valores
+# converte sem passar por objetos Python
+TIPO_TEXTO_SALDO = 'string[pyarrow]' if pa is not None else str
+
+SQL_INSERIR_DEMONSTRACAO = """
+    INSERT INTO demonstracoes_contabeis (ano, trimestre, registro_ans, conta_id, vl_saldo_final)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+SQL_INSERIR_CONTA = "INSERT INTO contas (cd_conta_contabil, descricao) VALUES (?, ?)"
+
+SQL_CRIAR_DEMONSTRACOES = '''
+    CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        data_importacao TEXT DEFAULT CURRENT_TIMESTAMP,
+        ano INTEGER,
+        trimestre INTEGER,
+        registro_ans TEXT,
+        conta_id INTEGER REFERENCES contas(id),
+        vl_saldo_final REAL
+    )
+    '''
+
+SQL_APAGAR_TRIMESTRE = "DELETE FROM demonstracoes_contabeis WHERE ano = ? AND trimestre = ?"
+
+SQL_REGISTRAR_IMPORTACAO = """
+    INSERT OR REPLACE INTO importacoes (caminho, tamanho, modificado_em, hash, tabela, ano, trimestre, registros)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Lotes que cada processo de leitura pode deixar prontos à frente do gravador
+LOTES_ADIANTADOS = 2
+
+URL_DEMONSTRACOES = "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis"
+
+# Downloads simultâneos (limitados para não sobrecarregar o servidor da ANS)
+DOWNLOADS_SIMULTANEOS = 4
+
+# Índices da tabela de demonstrações; na carga em massa são criados só no fim
+INDICES_DEMONSTRACOES = {
+    'idx_registro_ans': 'demonstracoes_contabeis(registro_ans)',
+    'idx_ano_trimestre': 'demonstracoes_contabeis(ano, trimestre)',
+    'idx_conta_id': 'demonstracoes_contabeis(conta_id)',
+}
+
+# idx_ano_trimestre fica durante a carga em massa: as linhas chegam em
+# ordem de ano e trimestre (inserção só no fim da árvore) e a troca de
+# trimestre e o consolidado dependem dele
+INDICES_ADIADOS = ['idx_registro_ans', 'idx_conta_id']
+
+# Nomes aceitos para cada coluna dos CSVs da ANS (normalizados, em ordem de
+# preferência); ver comum.formato_csv.mapear_colunas
+ESQUEMA_DEMONSTRACOES = {
+    'registro_ans': ['reg_ans', 'registro_ans'],
+    'cd_conta_contabil': ['cd_conta_contabil', 'conta_contabil'],
+    'descricao': ['descricao', 'ds_conta'],
+    'vl_saldo_final': ['vl_saldo_final', 'saldo_final'],
+}
+
+ESQUEMA_OPERADORAS = {
+    'registro_ans': ['registro_ans', 'reg_ans'],
+    'cnpj': ['cnpj'],
+    'razao_social': ['razao_social'],
+    'nome_fantasia': ['nome_fantasia', 'fantasia'],
+    'modalidade': ['modalidade'],
+    'logradouro': ['logradouro'],
+    'numero': ['numero'],
+    'complemento': ['complemento'],
+    'bairro': ['bairro'],
+    'cidade': ['cidade', 'municipio'],
+    'uf': ['uf', 'estado'],
+    'cep': ['cep'],
+    'ddd': ['ddd'],
+    'telefone': ['telefone', 'fone'],
+    'fax': ['fax'],
+    'email': ['endereco_eletronico', 'email', 'e_mail'],
+    'representante': ['representante'],
+    'cargo_representante': ['cargo_representante', 'cargo'],
+    'data_registro': ['data_registro_ans', 'data_registro'],
+    'data_atualizacao_dados': ['data_atualizacao_dados', 'data_atualizacao'],
+}
+
+# Categorias de conta usadas nas análises, com os padrões de descrição que
+# as identificam; cada código de conta é classificado uma única vez
+CATEGORIA_SINISTROS = 'eventos_sinistros_medico_hospitalar'
+CATEGORIAS_CONTA = {
+    CATEGORIA_SINISTROS: [
+        '%EVENTOS%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%',
+        '%EVENTOS/%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%',
+    ],
+}
+
+SQL_CONSOLIDAR_TRIMESTRE = """
+    INSERT INTO despesas_consolidadas (ano, trimestre, registro_ans, cd_conta_contabil, categoria, valor)
+    SELECT d.ano, d.trimestre, d.registro_ans, ct.cd_conta_contabil, c.categoria, SUM(d.vl_saldo_final)
+    FROM demonstracoes_contabeis d
+    JOIN contas ct ON ct.id = d.conta_id
+    LEFT JOIN categorias_contas c ON c.cd_conta_contabil = ct.cd_conta_contabil
+    WHERE d.ano = ? AND d.trimestre = ?
+    GROUP BY d.registro_ans, ct.cd_conta_contabil
+"""
+
+# Cache de páginas da carga em massa, em MB (ANS_CACHE_MB); fica residente
+# durante toda a importação, então máquinas pequenas devem usar menos
+CACHE_CARGA_EM_MASSA_MB = int(os.environ.get('ANS_CACHE_MB', 256))
+
+# Pragmas da carga em massa: WAL, fsync só no commit e o cache acima (valor
+# negativo é em KiB). temp_store fica no padrão (arquivo): a ordenação dos
+# índices que não cabe no cache vai para o disco em vez de crescer em memória
+PRAGMAS_CARGA_EM_MASSA = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -CACHE_CARGA_EM_MASSA_MB * 1024,
+}
+
+# Valores maiores que isso (em bytes) são raros e seguem pelo caminho célula a célula
+LARGURA_MAXIMA_VALOR = 32
+# Bytes do início da coluna examinados antes de tentar o caminho rápido de limpar_valores
+AMOSTRA_VALORES = 64 * 1024
+_DIGITOS_E_SINAL = b'0123456789-'
+_VIRGULA_PARA_PONTO = bytes.maketrans(b',', b'.')
+# Tudo o que a limpeza descarta; o ponto que sobrevive já foi trocado por vírgula
+_DESCARTADOS = bytes(sorted(set(range(256)) - set(b'0123456789,-')))
+_UM_POR_BYTE = np.uint64(0x0101010101010101)
+_DESLOCAMENTO_BYTE_ALTO = np.uint64(56)
+
 def criar_diretorios():
     """Cria os diretórios necessários para o download dos arquivos"""
     os.makedirs('dados_ans/demonstracoes_contabeis', exist_ok=True)
@@ -19,67 +176,69 @@ def criar_diretorios():
     print("Diretórios criados com sucesso!")
 
 def download_arquivo(url, caminho_destino):
-    """Faz o download de um arquivo e salva no caminho especificado"""
+    """Baixa o arquivo se ele mudou no servidor (requisição condicional, com retomada e novas tentativas)"""
     try:
         print(f"Baixando {url}...")
-        urllib.request.urlretrieve(url, caminho_destino)
-        print(f"Download concluído: {caminho_destino}")
+        if baixar(url, caminho_destino) == NAO_MODIFICADO:
+            print(f"Sem alterações no servidor: {caminho_destino}")
+        else:
+            print(f"Download concluído: {caminho_destino}")
         return True
     except Exception as e:
         print(f"Erro ao baixar {url}: {e}")
         return False
 
-def baixar_demonstracoes_contabeis():
-    """Baixa os arquivos de demonstrações contábeis dos últimos 2 anos"""
-    anos = [2023, 2024]
-    trimestres = [1, 2, 3, 4]
+def baixar_trimestre(ano, trimestre, url_base=URL_DEMONSTRACOES):
+    """Baixa (ou reaproveita) o CSV de um trimestre; devolve (ano, trimestre, caminho) ou None"""
+    url = f"{url_base}/{ano}/{trimestre}T{ano}.csv"
+    caminho_destino = f"dados_ans/demonstracoes_contabeis/{trimestre}T{ano}.csv"
     
-    arquivos_baixados = []
+    # Tenta fazer o download (se o arquivo já existe, só revalida: sem mudanças, nada é transferido)
+    if download_arquivo(url, caminho_destino):
+        return (ano, trimestre, caminho_destino)
     
-    for ano in anos:
-        for trimestre in trimestres:
-            url = f"https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/{ano}/{trimestre}T{ano}.csv"
-            caminho_destino = f"dados_ans/demonstracoes_contabeis/{trimestre}T{ano}.csv"
-            
-            # Se o arquivo já existe, não baixa novamente
-            if os.path.exists(caminho_destino):
-                print(f"Arquivo {caminho_destino} já existe. Pulando download.")
-                arquivos_baixados.append((ano, trimestre, caminho_destino))
-                continue
-            
-            # Tenta fazer o download
-            if download_arquivo(url, caminho_destino):
-                arquivos_baixados.append((ano, trimestre, caminho_destino))
-            else:
-                # Se não conseguir baixar, tenta com extensão .zip
-                url_zip = f"https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/{ano}/{trimestre}T{ano}.zip"
-                caminho_zip = f"dados_ans/demonstracoes_contabeis/{trimestre}T{ano}.zip"
-                
-                if download_arquivo(url_zip, caminho_zip):
-                    # Extrai o arquivo zip
-                    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-                        zip_ref.extractall("dados_ans/demonstracoes_contabeis/")
-                    
-                    # Remove o arquivo zip
-                    os.remove(caminho_zip)
-                    
-                    # Verifica se o CSV foi extraído
-                    if os.path.exists(caminho_destino):
-                        arquivos_baixados.append((ano, trimestre, caminho_destino))
+    # Se não conseguir baixar, tenta com extensão .zip
+    url_zip = f"{url_base}/{ano}/{trimestre}T{ano}.zip"
+    caminho_zip = f"dados_ans/demonstracoes_contabeis/{trimestre}T{ano}.zip"
+    
+    if download_arquivo(url_zip, caminho_zip):
+        # Extrai o arquivo zip só se ele mudou; o zip fica guardado para a próxima revalidação
+        if not os.path.exists(caminho_destino) or os.path.getmtime(caminho_zip) > os.path.getmtime(caminho_destino):
+            with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+                zip_ref.extractall("dados_ans/demonstracoes_contabeis/")
+        
+        # Verifica se o CSV foi extraído
+        if os.path.exists(caminho_destino):
+            return (ano, trimestre, caminho_destino)
     
-    return arquivos_baixados
+    # Sem acesso ao servidor, usa a cópia baixada antes
+    if os.path.exists(caminho_destino):
+        print(f"Usando a cópia local de {caminho_destino}.")
+        return (ano, trimestre, caminho_destino)
+    
+    return None
+
+def baixar_demonstracoes_contabeis(url_base=URL_DEMONSTRACOES, downloads_simultaneos=DOWNLOADS_SIMULTANEOS):
+    """Baixa os arquivos de demonstrações contábeis dos últimos 2 anos.
+
+    Os trimestres são baixados em paralelo por um pool de threads limitado;
+    a lista devolvida mantém a ordem por ano e trimestre. `url_base` pode
+    apontar para um servidor local ou para um diretório (file://).
+    """
+    anos = [2023, 2024]
+    trimestres = [1, 2, 3, 4]
+    periodos = [(ano, trimestre) for ano in anos for trimestre in trimestres]
+    
+    with ThreadPoolExecutor(max_workers=downloads_simultaneos) as executor:
+        resultados = executor.map(lambda periodo: baixar_trimestre(*periodo, url_base), periodos)
+        return [resultado for resultado in resultados if resultado is not None]
 
 def baixar_operadoras_ativas():
     """Baixa o arquivo de operadoras ativas"""
     url = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/operadoras_ativas.csv"
     caminho_destino = "dados_ans/operadoras_ativas/operadoras_ativas.csv"
     
-    # Se o arquivo já existe, não baixa novamente
-    if os.path.exists(caminho_destino):
-        print(f"Arquivo {caminho_destino} já existe. Pulando download.")
-        return caminho_destino
-    
-    # Tenta fazer o download
+    # Tenta fazer o download (se o arquivo já existe, só revalida: sem mudanças, nada é transferido)
     if download_arquivo(url, caminho_destino):
         return caminho_destino
     
@@ -88,17 +247,20 @@ def baixar_operadoras_ativas():
     caminho_zip = "dados_ans/operadoras_ativas/operadoras_ativas.zip"
     
     if download_arquivo(url_zip, caminho_zip):
-        # Extrai o arquivo zip
-        with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
-            zip_ref.extractall("dados_ans/operadoras_ativas/")
-        
-        # Remove o arquivo zip
-        os.remove(caminho_zip)
+        # Extrai o arquivo zip só se ele mudou; o zip fica guardado para a próxima revalidação
+        if not os.path.exists(caminho_destino) or os.path.getmtime(caminho_zip) > os.path.getmtime(caminho_destino):
+            with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+                zip_ref.extractall("dados_ans/operadoras_ativas/")
         
         # Verifica se o CSV foi extraído
         if os.path.exists(caminho_destino):
             return caminho_destino
     
+    # Sem acesso ao servidor, usa a cópia baixada antes
+    if os.path.exists(caminho_destino):
+        print(f"Usando a cópia local de {caminho_destino}.")
+        return caminho_destino
+    
     return None
 
 def criar_banco_sqlite():
@@ -107,20 +269,32 @@ def criar_banco_sqlite():
     conn = sqlite3.connect("ans_database.db")
     cursor = conn.cursor()
     
-    # Cria tabela para demonstrações contábeis
+    # Cria a dimensão de contas: cada par (código, descrição) é gravado uma
+    # vez e as demonstrações guardam só o id inteiro
     cursor.execute('''
-    CREATE TABLE IF NOT EXISTS demonstracoes_contabeis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        data_importacao TEXT DEFAULT CURRENT_TIMESTAMP,
-        ano INTEGER,
-        trimestre INTEGER,
-        registro_ans TEXT,
+    CREATE TABLE IF NOT EXISTS contas (
+        id INTEGER PRIMARY KEY,
         cd_conta_contabil TEXT,
         descricao TEXT,
-        vl_saldo_final REAL
+        UNIQUE (cd_conta_contabil, descricao)
     )
     ''')
     
+    # Bancos criados antes da tabela de contas guardavam o texto em cada linha
+    migrar_demonstracoes_para_contas(conn)
+    
+    # Cria tabela para demonstrações contábeis
+    cursor.execute(SQL_CRIAR_DEMONSTRACOES)
+    
+    # Visão com o formato antigo (código e descrição por linha), para consultas avulsas
+    cursor.execute('''
+    CREATE VIEW IF NOT EXISTS vw_demonstracoes_contabeis AS
+    SELECT d.id, d.data_importacao, d.ano, d.trimestre, d.registro_ans,
+           c.cd_conta_contabil, c.descricao, d.vl_saldo_final
+    FROM demonstracoes_contabeis d
+    LEFT JOIN contas c ON c.id = d.conta_id
+    ''')
+    
     # Cria tabela para operadoras ativas
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS operadoras_ativas (
@@ -147,10 +321,48 @@ def criar_banco_sqlite():
     )
     ''')
     
+    # Registro das importações: cada arquivo importado, com tamanho, data de
+    # modificação (ns) e hash, para só reimportar o que for novo ou tiver mudado
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS importacoes (
+        caminho TEXT PRIMARY KEY,
+        tamanho INTEGER,
+        modificado_em INTEGER,
+        hash TEXT,
+        tabela TEXT,
+        ano INTEGER,
+        trimestre INTEGER,
+        registros INTEGER,
+        data_importacao TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+    
+    # Categoria de cada código de conta, resolvida uma vez pela descrição
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS categorias_contas (
+        cd_conta_contabil TEXT PRIMARY KEY,
+        categoria TEXT
+    )
+    ''')
+    
+    # Consolidado das despesas por trimestre, operadora e conta, mantido a
+    # cada trimestre importado; as análises leem daqui em vez de varrer
+    # demonstracoes_contabeis com LIKE
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS despesas_consolidadas (
+        ano INTEGER,
+        trimestre INTEGER,
+        registro_ans TEXT,
+        cd_conta_contabil TEXT,
+        categoria TEXT,
+        valor REAL,
+        PRIMARY KEY (ano, trimestre, registro_ans, cd_conta_contabil)
+    )
+    ''')
+    
     # Cria índices para otimizar consultas
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_registro_ans ON demonstracoes_contabeis(registro_ans)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_ano_trimestre ON demonstracoes_contabeis(ano, trimestre)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_cd_conta_contabil ON demonstracoes_contabeis(cd_conta_contabil)')
+    criar_indices_demonstracoes(cursor)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_consolidado_categoria ON despesas_consolidadas(categoria, ano, trimestre, valor)')
     
     # Salva as alterações
     conn.commit()
@@ -158,35 +370,177 @@ def criar_banco_sqlite():
     
     print("Banco de dados e tabelas criados com sucesso!")
 
-def detectar_encoding(arquivo):
-    """Tenta detectar o encoding do arquivo"""
-    encodings = ['utf-8', 'latin1', 'iso-8859-1', 'cp1252']
+def criar_indices_demonstracoes(cursor):
+    """Cria os índices da tabela de demonstrações contábeis (se ainda não existirem)"""
+    for nome, definicao in INDICES_DEMONSTRACOES.items():
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS {nome} ON {definicao}')
+
+def remover_indices_demonstracoes(cursor):
+    """Remove os índices da tabela de demonstrações contábeis adiados na carga em massa"""
+    for nome in INDICES_ADIADOS:
+        cursor.execute(f'DROP INDEX IF EXISTS {nome}')
+
+def migrar_demonstracoes_para_contas(conn):
+    """Converte demonstracoes_contabeis do formato antigo (código e descrição em
+    cada linha) para conta_id, preenchendo a tabela de contas. Não faz nada se
+    o banco já estiver no formato novo.
+    """
+    colunas = {linha[1] for linha in conn.execute('PRAGMA table_info(demonstracoes_contabeis)')}
+    if 'descricao' not in colunas:
+        return
     
-    for encoding in encodings:
-        try:
-            with open(arquivo, 'r', encoding=encoding) as f:
-                f.read(1024)  # Tenta ler os primeiros 1024 bytes
-                return encoding
-        except UnicodeDecodeError:
-            continue
+    print("Migrando demonstrações contábeis para a tabela de contas...")
+    with transacao(conn, 'migracao'):
+        conn.execute('''
+            INSERT INTO contas (cd_conta_contabil, descricao)
+            SELECT DISTINCT cd_conta_contabil, descricao FROM demonstracoes_contabeis
+        ''')
+        conn.execute('ALTER TABLE demonstracoes_contabeis RENAME TO demonstracoes_contabeis_antiga')
+        conn.execute(SQL_CRIAR_DEMONSTRACOES)
+        conn.execute('''
+            INSERT INTO demonstracoes_contabeis (id, data_importacao, ano, trimestre, registro_ans, conta_id, vl_saldo_final)
+            SELECT d.id, d.data_importacao, d.ano, d.trimestre, d.registro_ans, c.id, d.vl_saldo_final
+            FROM demonstracoes_contabeis_antiga d
+            JOIN contas c ON c.cd_conta_contabil IS d.cd_conta_contabil AND c.descricao IS d.descricao
+        ''')
+        conn.execute('DROP TABLE demonstracoes_contabeis_antiga')
+        criar_indices_demonstracoes(conn)
     
-    # Se falhar em detectar, retorna utf-8 como padrão
-    return 'utf-8'
+    # Devolve ao sistema as páginas que o texto repetido ocupava
+    conn.execute('VACUUM')
 
-def detectar_delimitador(arquivo, encoding):
-    """Tenta detectar o delimitador do arquivo CSV"""
-    with open(arquivo, 'r', encoding=encoding) as f:
-        linha = f.readline()
-        
-        if ';' in linha:
-            return ';'
-        elif ',' in linha:
-            return ','
-        elif '\t' in linha:
-            return '\t'
-        
-    # Se falhar em detectar, retorna ponto e vírgula como padrão
-    return ';'
+def carregar_contas(conn):
+    """Dicionário (cd_conta_contabil, descricao) -> id das contas já gravadas"""
+    return {(codigo, descricao): conta_id
+            for conta_id, codigo, descricao in conn.execute('SELECT id, cd_conta_contabil, descricao FROM contas')}
+
+def internar_contas(conn, contas, pares):
+    """Ids dos pares (código, descrição), gravando em contas os que ainda não existem.
+
+    `contas` é o cache de carregar_contas, atualizado no lugar.
+    """
+    ids = []
+    for par in pares:
+        conta_id = contas.get(par)
+        if conta_id is None:
+            conta_id = conn.execute(SQL_INSERIR_CONTA, par).lastrowid
+            contas[par] = conta_id
+        ids.append(conta_id)
+    return np.array(ids, dtype=np.int64)
+
+def fatorar_contas(codigos, descricoes):
+    """Separa as contas distintas de um lote.
+
+    Devolve (pares, indices): a lista de pares (código, descrição) únicos,
+    com None no lugar de valores ausentes, e a posição do par de cada linha.
+    """
+    indices_codigo, codigos_unicos = pd.factorize(codigos)
+    indices_descricao, descricoes_unicas = pd.factorize(descricoes)
+    
+    # Combina os dois códigos num só inteiro (-1, ausente, vira 0)
+    base = len(descricoes_unicas) + 1
+    indices, combinados = pd.factorize((indices_codigo + 1) * base + (indices_descricao + 1))
+    
+    # Texto, como o SQLite guardaria (colunas lidas como número viram '411111')
+    codigos_unicos = [None] + [str(valor) for valor in codigos_unicos]
+    descricoes_unicas = [None] + [str(valor) for valor in descricoes_unicas]
+    pares = [(codigos_unicos[c // base], descricoes_unicas[c % base]) for c in combinados]
+    return pares, indices
+
+def resolver_categorias(conn, ano, trimestre):
+    """Classifica, pela descrição, as contas do trimestre que ainda não têm categoria"""
+    casos = []
+    parametros = []
+    for categoria, padroes in CATEGORIAS_CONTA.items():
+        casos.append('WHEN ' + ' OR '.join(['descricao LIKE ?'] * len(padroes)) + ' THEN ?')
+        parametros += padroes + [categoria]
+    
+    # Cada descrição distinta é testada uma vez, na tabela de contas
+    conn.execute(f"""
+        INSERT OR IGNORE INTO categorias_contas (cd_conta_contabil, categoria)
+        SELECT cd_conta_contabil, MAX(CASE {' '.join(casos)} END)
+        FROM contas
+        WHERE id IN (SELECT DISTINCT conta_id FROM demonstracoes_contabeis WHERE ano = ? AND trimestre = ?)
+        GROUP BY cd_conta_contabil
+    """, parametros + [ano, trimestre])
+
+def atualizar_consolidado(conn, ano, trimestre):
+    """Refaz o consolidado de um trimestre (na transação em andamento)"""
+    resolver_categorias(conn, ano, trimestre)
+    conn.execute("DELETE FROM despesas_consolidadas WHERE ano = ? AND trimestre = ?", (ano, trimestre))
+    conn.execute(SQL_CONSOLIDAR_TRIMESTRE, (ano, trimestre))
+
+def garantir_consolidado(conn):
+    """Monta o consolidado de bancos importados antes dele existir"""
+    consolidado_vazio = conn.execute('SELECT 1 FROM despesas_consolidadas LIMIT 1').fetchone() is None
+    tem_dados = conn.execute('SELECT 1 FROM demonstracoes_contabeis LIMIT 1').fetchone() is not None
+    
+    if consolidado_vazio and tem_dados:
+        print("Montando o consolidado de despesas a partir dos dados já importados...")
+        with transacao(conn, 'consolidado'):
+            periodos = conn.execute('SELECT DISTINCT ano, trimestre FROM demonstracoes_contabeis').fetchall()
+            for ano, trimestre in periodos:
+                atualizar_consolidado(conn, ano, trimestre)
+
+def aplicar_pragmas(conn, pragmas):
+    """Aplica um dicionário de pragmas à conexão"""
+    for pragma, valor in pragmas.items():
+        conn.execute(f'PRAGMA {pragma} = {valor}')
+
+@contextmanager
+def transacao(conn, nome='arquivo'):
+    """Savepoint que abre a própria transação ou se aninha numa transação já aberta.
+
+    Se o bloco falhar, só o que foi gravado dentro dele é desfeito.
+    """
+    conn.execute(f'SAVEPOINT {nome}')
+    try:
+        yield
+    except BaseException:
+        conn.execute(f'ROLLBACK TO {nome}')
+        conn.execute(f'RELEASE {nome}')
+        raise
+    conn.execute(f'RELEASE {nome}')
+
+def calcular_hash(caminho, tamanho_bloco=1024 * 1024):
+    """SHA-256 do arquivo, lido em blocos"""
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def impressao_digital(conn, caminho):
+    """Compara o arquivo com o registro de importações.
+
+    Devolve None se o arquivo já foi importado e não mudou; senão, a
+    impressão digital (tamanho, modificado_em, hash) a registrar depois da
+    importação. Com tamanho e data de modificação iguais aos registrados,
+    o arquivo é pulado sem calcular o hash.
+    """
+    estado = os.stat(caminho)
+    registrado = conn.execute(
+        'SELECT tamanho, modificado_em, hash FROM importacoes WHERE caminho = ?', (caminho,)
+    ).fetchone()
+    
+    if registrado and registrado[:2] == (estado.st_size, estado.st_mtime_ns):
+        return None
+    
+    hash_arquivo = calcular_hash(caminho)
+    if registrado and (registrado[0], registrado[2]) == (estado.st_size, hash_arquivo):
+        # Mesmo conteúdo com outra data (ex.: baixado de novo): só atualiza o registro
+        with conn:
+            conn.execute('UPDATE importacoes SET modificado_em = ? WHERE caminho = ?',
+                         (estado.st_mtime_ns, caminho))
+        return None
+    
+    return (estado.st_size, estado.st_mtime_ns, hash_arquivo)
+
+def registrar_importacao(conn, caminho, impressao, tabela, registros, ano=None, trimestre=None):
+    """Grava o arquivo no registro de importações (na transação em andamento)"""
+    tamanho, modificado_em, hash_arquivo = impressao
+    conn.execute(SQL_REGISTRAR_IMPORTACAO,
+                 (caminho, tamanho, modificado_em, hash_arquivo, tabela, ano, trimestre, registros))
 
 def limpar_valor(valor):
     """Limpa e converte um valor monetário para float"""
@@ -211,63 +565,584 @@ def limpar_valor(valor):
     else:
         return float(valor)
 
-def importar_demonstracoes_contabeis(arquivos_baixados):
-    """Importa os dados das demonstrações contábeis para o banco de dados"""
+def _contar_por_linha(mascara):
+    """Conta os bytes marcados em cada linha de uma máscara (n, largura múltipla de 8)"""
+    palavras = mascara.view(np.uint64)
+    soma = palavras[:, 0].copy()
+    for coluna in range(1, palavras.shape[1]):
+        soma += palavras[:, coluna]
+    # Cada byte vale 0 ou 1; multiplicar por 0x0101... acumula a soma no byte mais alto
+    return ((soma * _UM_POR_BYTE) >> _DESLOCAMENTO_BYTE_ALTO).astype(np.int64)
+
+def _offsets_e_dados(textos):
+    """Offsets (int64) e buffer de dados de um large_string do Arrow"""
+    _, buffer_offsets, buffer_dados = textos.buffers()
+    offsets = np.frombuffer(buffer_offsets, dtype=np.int64, count=len(textos) + 1, offset=textos.offset * 8)
+    return offsets, buffer_dados
+
+def _converter_textos(n, offsets, dados):
+    """Converte n textos já no formato do float() com o cast nativo do Arrow"""
+    textos = pa.LargeStringArray.from_buffers(n, pa.py_buffer(offsets), pa.py_buffer(dados))
+    return pc.cast(textos, pa.float64()).to_numpy(zero_copy_only=False, writable=True)
+
+def _separadores(dados):
+    """Separadores (',' e '.') da coluna, ou None se ela tiver algo além de dígitos, sinal e separadores"""
+    # A amostra descarta cedo as colunas com texto; a coluna inteira é conferida
+    # em seguida, porque o cast do Arrow aceitaria '1e5' ou 'inf', que limpar_valor não aceita
+    for trecho in (dados[:AMOSTRA_VALORES], dados):
+        separadores = trecho.translate(None, _DIGITOS_E_SINAL)
+        if separadores.translate(None, b',.'):
+            return None
+    return separadores
+
+def limpar_valores(serie):
+    """Versão vetorizada de limpar_valor para uma coluna inteira (mesmo resultado, célula a célula).
+
+    Colunas só com dígitos, sinal e separadores vão direto para o cast nativo
+    do Arrow (que, nesse alfabeto, aceita exatamente o que o float() aceita);
+    o caminho geral valida cada linha antes do cast e deixa os valores não
+    ASCII ou muito longos para limpar_valor.
+    """
+    if pd.api.types.is_numeric_dtype(serie):
+        return pd.Series(serie.astype(float).fillna(0.0), index=serie.index)
+    
+    # Sem pyarrow, ou com tipos misturados (números e textos), segue célula a célula
+    if pa is None:
+        return serie.map(limpar_valor).astype(float)
+    try:
+        textos = pa.array(serie, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return serie.map(limpar_valor).astype(float)
+    if isinstance(textos, pa.ChunkedArray):
+        textos = textos.combine_chunks()
+    if not (pa.types.is_string(textos.type) or pa.types.is_large_string(textos.type)
+            or pa.types.is_null(textos.type)):
+        return serie.map(limpar_valor).astype(float)
+    
+    textos = pc.cast(textos, pa.large_string())
+    if textos.null_count:
+        textos = textos.fill_null('')
+    n = len(textos)
+    if n == 0:
+        return pd.Series(np.zeros(0), index=serie.index)
+    
+    # Células vazias valem 0.0 em limpar_valor; trocadas por '0', não atrapalham o cast
+    tamanhos = pc.binary_length(textos).to_numpy()
+    vazios = tamanhos == 0
+    if vazios.any():
+        textos = pc.if_else(pa.array(vazios), '0', textos)
+        tamanhos = np.where(vazios, 1, tamanhos)
+    
+    offsets, buffer_dados = _offsets_e_dados(textos)
+    dados = memoryview(buffer_dados)[offsets[0]:offsets[-1]].tobytes()
+    separadores = _separadores(dados)
+    
+    # Um único tipo de separador: limpar_valor só troca a vírgula por ponto
+    if separadores is not None and not (b',' in separadores and b'.' in separadores):
+        try:
+            return pd.Series(_converter_textos(n, offsets - offsets[0], dados.translate(_VIRGULA_PARA_PONTO)),
+                             index=serie.index)
+        except pa.ArrowInvalid:
+            # Alguma célula não converte (como '-' ou '1,2,3'): a validação abaixo é necessária
+            separadores = None
+    
+    # Valores muito longos (e, abaixo, os não ASCII) ficam com a função original
+    lento = tamanhos > LARGURA_MAXIMA_VALOR
+    if lento.any():
+        textos = pc.if_else(pa.array(lento), '', textos)
+    
+    # Alinha tudo à direita com espaços (que limpar_valor descartaria de qualquer
+    # forma) para enxergar a coluna como uma matriz de bytes n x largura
+    largura = max(8, -(-int(tamanhos[~lento].max(initial=0)) // 8) * 8)
+    alinhados = pc.ascii_lpad(textos, largura, ' ')
+    offsets, buffer_dados = _offsets_e_dados(alinhados)
+    matriz = np.frombuffer(buffer_dados, dtype=np.uint8, count=n * largura, offset=offsets[0]).reshape(n, largura).copy()
+    
+    n_virgulas = _contar_por_linha(matriz == ord(','))
+    n_pontos = _contar_por_linha(matriz == ord('.'))
+    
+    # Sem vírgula, o ponto é o separador decimal e vira vírgula para sobreviver
+    # à limpeza abaixo; com vírgula, é separador de milhar e some (como em limpar_valor)
+    so_ponto = np.flatnonzero((n_virgulas == 0) & (n_pontos > 0))
+    if len(so_ponto):
+        linhas = matriz[so_ponto]
+        linhas[linhas == ord('.')] = ord(',')
+        matriz[so_ponto] = linhas
+    
+    # Coluna sem texto (formato 1.234,56): a limpeza só tira os pontos de milhar,
+    # e uma célula que o float() recusaria faz o cast falhar
+    if separadores is not None and not lento.any():
+        novos_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(tamanhos - np.where(n_virgulas > 0, n_pontos, 0), out=novos_offsets[1:])
+        limpo = bytearray(matriz).translate(_VIRGULA_PARA_PONTO, _DESCARTADOS)
+        try:
+            return pd.Series(_converter_textos(n, novos_offsets, limpo), index=serie.index)
+        except pa.ArrowInvalid:
+            pass
+    
+    nao_ascii = matriz >= 128
+    if nao_ascii.any():
+        lento |= nao_ascii.any(axis=1)
+    
+    n_menos = _contar_por_linha(matriz == ord('-'))
+    n_digitos = _contar_por_linha((matriz - np.uint8(ord('0'))) < 10)
+    
+    # float() aceita no máximo um separador e um sinal, e exige ao menos um dígito
+    n_separadores = np.where(n_virgulas > 0, n_virgulas, n_pontos)
+    valido = (n_digitos > 0) & (n_separadores <= 1) & (n_menos <= 1) & ~lento
+    
+    # Linhas inválidas viram uma sequência de zeros (zeradas de novo depois do cast)
+    tamanhos_limpos = n_digitos + n_separadores + n_menos
+    invalidos = np.flatnonzero(~valido)
+    if len(invalidos):
+        matriz[invalidos] = ord('0')
+        tamanhos_limpos[invalidos] = largura
+    
+    # Uma única passada em C descarta o que limpar_valor descartaria e troca a vírgula por ponto
+    limpo = bytearray(matriz).translate(_VIRGULA_PARA_PONTO, _DESCARTADOS)
+    novos_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(tamanhos_limpos, out=novos_offsets[1:])
+    
+    # O sinal só é aceito na frente ('5-' e '1-2' valem 0.0); as linhas com o sinal
+    # fora do lugar são raras e viram zeros como as inválidas
+    dados = np.frombuffer(limpo, dtype=np.uint8)
+    com_sinal = valido & (n_menos == 1)
+    sinal_na_frente = dados[novos_offsets[:-1]] == ord('-')
+    sinal_fora = invalidos[:0]
+    if np.count_nonzero(sinal_na_frente) != np.count_nonzero(com_sinal):
+        sinal_fora = np.flatnonzero(com_sinal & ~sinal_na_frente)
+        for linha in sinal_fora.tolist():
+            dados[novos_offsets[linha]:novos_offsets[linha + 1]] = ord('0')
+    
+    resultado = _converter_textos(n, novos_offsets, limpo)
+    resultado[invalidos] = 0.0
+    resultado[sinal_fora] = 0.0
+    
+    if lento.any():
+        posicoes = np.flatnonzero(lento)
+        resultado[posicoes] = [limpar_valor(valor) for valor in serie.iloc[posicoes].tolist()]
+    
+    return pd.Series(resultado, index=serie.index)
+
+def identificar_colunas_demonstracoes(arquivo, formato):
+    """Nome original de cada coluna usada de um arquivo de demonstrações.
+
+    Falta de coluna é erro, não arquivo vazio: a exceção desfaz a troca do
+    trimestre, o arquivo não entra no registro de importações e a próxima
+    execução tenta de novo.
+    """
+    mapa = mapear_colunas(formato.colunas, ESQUEMA_DEMONSTRACOES)
+    ausentes = [coluna for coluna, original in mapa.items() if original is None]
+    if ausentes:
+        raise ValueError(f"Colunas necessárias não encontradas em {arquivo}: {', '.join(ausentes)}")
+    return mapa
+
+def importar_arquivo_completo(conn, ano, trimestre, arquivo, formato, contas):
+    """Lê o arquivo inteiro em memória e grava com executemany"""
+    # Identifica colunas relevantes pelo cabeçalho, antes de ler o arquivo
+    mapa = identificar_colunas_demonstracoes(arquivo, formato)
+    
+    # Lê o arquivo CSV
+    df = pd.read_csv(arquivo, delimiter=formato.delimitador, encoding=formato.encoding,
+                     encoding_errors=ERROS_ENCODING,
+                     usecols=list(mapa.values()), low_memory=False)
+    
+    # Troca código e descrição pelo id da conta
+    pares, indices = fatorar_contas(df[mapa['cd_conta_contabil']], df[mapa['descricao']])
+    ids_contas = internar_contas(conn, contas, pares)
+    
+    # Cria DataFrame com as colunas padronizadas
+    df_padronizado = pd.DataFrame({
+        'ano': ano,
+        'trimestre': trimestre,
+        'registro_ans': df[mapa['registro_ans']],
+        'conta_id': ids_contas[indices],
+        'vl_saldo_final': limpar_valores(df[mapa['vl_saldo_final']])
+    })
+    
+    # Importa para o banco de dados (executemany em vez de to_sql, que faria
+    # commit por conta própria no meio da transação do arquivo)
+    conn.executemany(SQL_INSERIR_DEMONSTRACAO, df_padronizado.itertuples(index=False, name=None))
+    
+    return len(df_padronizado)
+
+def ler_lotes_demonstracao(arquivo, formato, tamanho_lote=TAMANHO_LOTE):
+    """Lê o arquivo em lotes de tamanho fixo, devolvendo as colunas de cada lote já limpas.
+
+    Só as quatro colunas usadas são lidas, como texto. Cada lote sai como
+    (registros, pares, indices, saldos): as contas distintas do lote e a
+    posição da conta de cada linha (ver fatorar_contas), em vez de repetir
+    código e descrição em todas as linhas.
+    """
+    # As colunas saem do cabeçalho já lido na detecção do formato
+    mapa = identificar_colunas_demonstracoes(arquivo, formato)
+    
+    registro_col = mapa['registro_ans']
+    conta_col = mapa['cd_conta_contabil']
+    descricao_col = mapa['descricao']
+    saldo_col = mapa['vl_saldo_final']
+    
+    leitor = pd.read_csv(arquivo, delimiter=formato.delimitador, encoding=formato.encoding,
+                         dtype={registro_col: str, conta_col: str, descricao_col: str, saldo_col: TIPO_TEXTO_SALDO},
+                         encoding_errors=ERROS_ENCODING,
+                         usecols=[registro_col, conta_col, descricao_col, saldo_col],
+                         chunksize=tamanho_lote)
+    
+    for lote in leitor:
+        pares, indices = fatorar_contas(lote[conta_col], lote[descricao_col])
+        yield (
+            lote[registro_col].tolist(),
+            pares,
+            indices,
+            limpar_valores(lote[saldo_col]).tolist()
+        )
+
+def importar_arquivo_streaming(conn, ano, trimestre, arquivo, formato, contas, tamanho_lote=TAMANHO_LOTE):
+    """Lê o arquivo em lotes de tamanho fixo e grava com executemany em uma única transação.
+
+    Cada lote é descartado depois de gravado: a memória fica limitada pelo
+    tamanho do lote, qualquer que seja o tamanho do arquivo.
+    """
+    total = 0
+    cursor = conn.cursor()
+    
+    with transacao(conn):  # Por arquivo: ou entra tudo, ou nada
+        for registros, pares, indices, saldos in ler_lotes_demonstracao(arquivo, formato, tamanho_lote):
+            ids_contas = internar_contas(conn, contas, pares)[indices].tolist()
+            linhas = zip(repeat(ano), repeat(trimestre), registros, ids_contas, saldos)
+            cursor.executemany(SQL_INSERIR_DEMONSTRACAO, linhas)
+            total += len(registros)
+    
+    return total
+
+# Filas compartilhadas com o gravador (uma por arquivo), definidas em cada processo de leitura
+_filas_lotes = None
+
+def _iniciar_processo_leitura(filas):
+    global _filas_lotes
+    _filas_lotes = filas
+
+def ler_arquivo_para_fila(indice, arquivo, formato, tamanho_lote=TAMANHO_LOTE):
+    """Roda num processo de leitura: lê e limpa o arquivo e envia os lotes ao gravador.
+
+    Os lotes vão para a fila do arquivo (`indice`). O formato vem detectado
+    do processo principal (o cache de formatos é por processo). Termina
+    sempre com uma mensagem 'fim' (total de linhas) ou 'erro'.
+    """
+    fila = _filas_lotes[indice]
+    total = 0
+    try:
+        for lote in ler_lotes_demonstracao(arquivo, formato, tamanho_lote):
+            fila.put(('lote', lote))
+            total += len(lote[0])
+    except Exception as e:
+        fila.put(('erro', str(e)))
+    else:
+        fila.put(('fim', total))
+
+def receber_lotes(fila, futuro):
+    """Lotes de um arquivo, na ordem, até a mensagem 'fim'; uma mensagem 'erro' vira exceção"""
+    while True:
+        try:
+            tipo, conteudo = fila.get(timeout=1)
+        except queue.Empty:
+            # Processo que morreu sem conseguir avisar (ex.: falta de memória)
+            if futuro.done() and futuro.exception() is not None:
+                raise futuro.exception()
+            continue
+        
+        if tipo == 'lote':
+            yield conteudo
+        elif tipo == 'fim':
+            return
+        else:
+            raise RuntimeError(conteudo)
+
+def esvaziar_fila(fila, futuro):
+    """Descarta o que ainda vier na fila, para o processo bloqueado em put() poder terminar"""
+    while True:
+        try:
+            tipo, _ = fila.get(timeout=0.1)
+        except queue.Empty:
+            if futuro.done():
+                return
+            continue
+        if tipo != 'lote':
+            return
+
+def importar_em_paralelo(conn, pendentes, processos, tamanho_lote=TAMANHO_LOTE):
+    """Lê e limpa os arquivos em processos separados; só esta função grava no banco.
+
+    `pendentes` traz (ano, trimestre, arquivo, impressao). Cada arquivo tem
+    a sua fila, limitada a LOTES_ADIANTADOS lotes: os processos leem à
+    frente, mas a memória não cresce se a gravação ficar para trás. O
+    gravador pega os arquivos na ordem e insere cada lote direto em
+    demonstracoes_contabeis, dentro do savepoint do trimestre; se o arquivo
+    falhar no meio, os dados antigos do trimestre ficam intactos.
+    """
+    filas = [multiprocessing.Queue(maxsize=LOTES_ADIANTADOS) for _ in pendentes]
+    cursor = conn.cursor()
+    contas = carregar_contas(conn)
+    futuros = []
+    
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_processo_leitura,
+                             initargs=(filas,)) as executor:
+        try:
+            # Os arquivos começam na ordem em que serão gravados, então o processo
+            # do arquivo que o gravador espera nunca fica atrás dos seguintes
+            for indice, (_, _, arquivo, _) in enumerate(pendentes):
+                futuros.append(executor.submit(ler_arquivo_para_fila, indice, arquivo,
+                                               detectar_formato(arquivo), tamanho_lote))
+            
+            for indice, (ano, trimestre, arquivo, impressao) in enumerate(pendentes):
+                print(f"Importando {arquivo}...")
+                total = 0
+                
+                try:
+                    # Troca o trimestre inteiro de uma vez: dados antigos saem só se os novos entrarem
+                    with transacao(conn, 'trimestre'):
+                        cursor.execute(SQL_APAGAR_TRIMESTRE, (ano, trimestre))
+                        for registros, pares, indices, saldos in receber_lotes(filas[indice], futuros[indice]):
+                            ids_contas = internar_contas(conn, contas, pares)[indices].tolist()
+                            linhas = zip(repeat(ano), repeat(trimestre), registros, ids_contas, saldos)
+                            cursor.executemany(SQL_INSERIR_DEMONSTRACAO, linhas)
+                            total += len(registros)
+                        atualizar_consolidado(conn, ano, trimestre)
+                        registrar_importacao(conn, arquivo, impressao, 'demonstracoes_contabeis', total, ano, trimestre)
+                    
+                    print(f"Importação de {arquivo} concluída: {total} registros.")
+                
+                except Exception as e:
+                    print(f"Erro ao importar {arquivo}: {e}")
+                    esvaziar_fila(filas[indice], futuros[indice])
+                    # As contas novas do arquivo saíram no rollback; o cache precisa acompanhar
+                    contas = carregar_contas(conn)
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            for fila, futuro in zip(filas, futuros):
+                esvaziar_fila(fila, futuro)
+            raise
+
+def importar_demonstracoes_contabeis(arquivos_baixados, streaming=True, carga_em_massa=True, processos=None):
+    """Importa os dados das demonstrações contábeis para o banco de dados.
+
+    Só entram os arquivos novos ou alterados desde a última importação
+    (conforme a tabela importacoes); cada um substitui o seu trimestre
+    numa transação própria, então uma execução interrompida deixa apenas
+    trimestres completos e a próxima continua de onde parou.
+
+    Com mais de um processo (padrão: um por núcleo, até o número de
+    arquivos), a leitura e a limpeza dos CSVs rodam em paralelo e uma
+    única conexão grava os lotes; esse caminho sempre lê em streaming.
+
+    Na carga em massa a conexão usa os pragmas de PRAGMAS_CARGA_EM_MASSA
+    e, se a tabela estiver vazia, os índices de INDICES_ADIADOS são
+    removidos antes e recriados no fim. Numa carga incremental os índices
+    ficam: recriá-los sobre a tabela toda custaria mais do que manter os
+    poucos trimestres novos.
+
+    Junto com cada trimestre, na mesma transação, é refeito o seu trecho
+    de despesas_consolidadas.
+    """
     conn = sqlite3.connect("ans_database.db")
+    garantir_consolidado(conn)
     
-    # Verificar se já existem dados no banco
-    query = "SELECT COUNT(*) FROM demonstracoes_contabeis"
-    count = pd.read_sql_query(query, conn).iloc[0, 0]
+    # Separa o que é novo ou mudou desde a última importação
+    pendentes = []
+    for ano, trimestre, arquivo in arquivos_baixados:
+        impressao = impressao_digital(conn, arquivo)
+        if impressao is None:
+            print(f"Arquivo {arquivo} já importado e sem alterações. Pulando.")
+        else:
+            pendentes.append((ano, trimestre, arquivo, impressao))
     
-    if count > 0:
-        print(f"Já existem {count} registros na tabela de demonstrações contábeis. Pulando importação.")
+    if not pendentes:
+        print("Nenhum arquivo novo ou alterado de demonstrações contábeis.")
         conn.close()
         return
     
-    for ano, trimestre, arquivo in arquivos_baixados:
-        print(f"Importando {arquivo}...")
+    tempos = {}
+    inicio = time.perf_counter()
+    
+    tabela_vazia = conn.execute('SELECT 1 FROM demonstracoes_contabeis LIMIT 1').fetchone() is None
+    remover_indices = carga_em_massa and tabela_vazia
+    
+    if carga_em_massa:
+        aplicar_pragmas(conn, PRAGMAS_CARGA_EM_MASSA)
+    if remover_indices:
+        remover_indices_demonstracoes(conn)
+    tempos['preparação'] = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    
+    if processos is None:
+        processos = min(os.cpu_count() or 1, len(pendentes))
+    contas = carregar_contas(conn)
+    
+    try:
+        if processos > 1:
+            importar_em_paralelo(conn, pendentes, processos)
+        else:
+            for ano, trimestre, arquivo, impressao in pendentes:
+                print(f"Importando {arquivo}...")
+                
+                # Detecta encoding, delimitador e colunas numa leitura só do início do arquivo
+                formato = detectar_formato(arquivo)
+                
+                try:
+                    # Troca o trimestre inteiro de uma vez: dados antigos saem só se os novos entrarem
+                    with transacao(conn, 'trimestre'):
+                        conn.execute(SQL_APAGAR_TRIMESTRE, (ano, trimestre))
+                        if streaming:
+                            total = importar_arquivo_streaming(conn, ano, trimestre, arquivo, formato, contas)
+                        else:
+                            total = importar_arquivo_completo(conn, ano, trimestre, arquivo, formato, contas)
+                        atualizar_consolidado(conn, ano, trimestre)
+                        registrar_importacao(conn, arquivo, impressao, 'demonstracoes_contabeis', total, ano, trimestre)
+                    
+                    print(f"Importação de {arquivo} concluída: {total} registros.")
+                
+                except Exception as e:
+                    print(f"Erro ao importar {arquivo}: {e}")
+                    # As contas novas do arquivo saíram no rollback; o cache precisa acompanhar
+                    contas = carregar_contas(conn)
         
-        # Detecta encoding e delimitador
-        encoding = detectar_encoding(arquivo)
-        delimitador = detectar_delimitador(arquivo, encoding)
+        tempos['carga'] = time.perf_counter() - inicio
+    
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
         
-        try:
-            # Lê o arquivo CSV
-            df = pd.read_csv(arquivo, delimiter=delimitador, encoding=encoding, low_memory=False)
-            
-            # Verifica e padroniza os nomes das colunas
-            colunas = [col.lower() for col in df.columns]
-            df.columns = colunas
-            
-            # Identifica colunas relevantes
-            registro_col = next((col for col in colunas if 'registro' in col and 'ans' in col), None)
-            conta_col = next((col for col in colunas if 'conta' in col), None)
-            descricao_col = next((col for col in colunas if 'descri' in col), None)
-            saldo_col = next((col for col in colunas if 'saldo' in col), None)
-            
-            if not all([registro_col, conta_col, descricao_col, saldo_col]):
-                print(f"Colunas necessárias não encontradas em {arquivo}. Pulando.")
-                continue
-            
-            # Cria DataFrame com as colunas padronizadas
-            df_padronizado = pd.DataFrame({
-                'ano': ano,
-                'trimestre': trimestre,
-                'registro_ans': df[registro_col],
-                'cd_conta_contabil': df[conta_col],
-                'descricao': df[descricao_col],
-                'vl_saldo_final': df[saldo_col].apply(limpar_valor)
-            })
-            
-            # Importa para o banco de dados
-            df_padronizado.to_sql('demonstracoes_contabeis', conn, if_exists='append', index=False)
-            
-            print(f"Importação de {arquivo} concluída: {len(df_padronizado)} registros.")
+        # Os índices voltam mesmo se a carga for interrompida
+        if remover_indices:
+            inicio = time.perf_counter()
+            criar_indices_demonstracoes(conn)
+            tempos['índices'] = time.perf_counter() - inicio
         
+        if carga_em_massa:
+            inicio = time.perf_counter()
+            conn.execute('ANALYZE')
+            tempos['analyze'] = time.perf_counter() - inicio
+        
+        conn.close()
+    
+    print("\nTempo por fase da importação:")
+    for fase, segundos in tempos.items():
+        print(f"  {fase}: {segundos:.2f}s")
+
+def _like_para_regex(padrao):
+    """Traduz um padrão LIKE do SQLite (sem distinção de caixa só em ASCII) para regex"""
+    partes = ('.*' if c == '%' else '.' if c == '_' else re.escape(c) for c in padrao)
+    return re.compile(''.join(partes), re.IGNORECASE | re.ASCII | re.DOTALL)
+
+def classificar_contas(contas, descricoes, categorias):
+    """Completa `categorias` (conta -> categoria) com as contas ainda não vistas.
+
+    Mesma regra de resolver_categorias: a conta recebe a categoria cujo
+    padrão casa com alguma das suas descrições e não é reclassificada depois.
+    """
+    padroes = {categoria: [_like_para_regex(p) for p in lista] for categoria, lista in CATEGORIAS_CONTA.items()}
+    novas = {}
+    
+    for conta, descricao in set(zip(contas, descricoes)):
+        if not isinstance(conta, str) or conta in categorias:
+            continue
+        categoria = None
+        if isinstance(descricao, str):
+            categoria = next((cat for cat, regexes in padroes.items()
+                              if any(r.fullmatch(descricao) for r in regexes)), None)
+        if novas.get(conta) is None or (categoria is not None and categoria > novas[conta]):
+            novas[conta] = categoria
+    
+    categorias.update(novas)
+
+def caminho_particao(ano, trimestre, destino=DIRETORIO_PARQUET):
+    return os.path.join(destino, f'ano={ano}', f'trimestre={trimestre}', 'dados.parquet')
+
+def impressao_parquet(caminho_parquet, arquivo):
+    """Como impressao_digital, mas comparando com os metadados gravados na própria partição"""
+    estado = os.stat(arquivo)
+    metadados = {}
+    if os.path.exists(caminho_parquet):
+        metadados = pq.read_schema(caminho_parquet).metadata or {}
+    
+    tamanho = str(estado.st_size).encode()
+    if metadados.get(b'tamanho') == tamanho and metadados.get(b'modificado_em') == str(estado.st_mtime_ns).encode():
+        return None
+    
+    hash_arquivo = calcular_hash(arquivo)
+    if metadados.get(b'tamanho') == tamanho and metadados.get(b'hash') == hash_arquivo.encode():
+        return None
+    
+    return (estado.st_size, estado.st_mtime_ns, hash_arquivo)
+
+def exportar_trimestre_parquet(ano, trimestre, arquivo, impressao, categorias, destino=DIRETORIO_PARQUET):
+    """Grava um trimestre como partição Parquet, lote a lote, com colunas de texto em dicionário.
+
+    O arquivo é escrito com nome temporário (ignorado pelo dataset, por
+    começar com ponto) e só substitui a partição anterior quando completo.
+    """
+    caminho = caminho_particao(ano, trimestre, destino)
+    temporario = os.path.join(os.path.dirname(caminho), '.dados.parquet.tmp')
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    
+    tamanho, modificado_em, hash_arquivo = impressao
+    esquema = pa.schema([
+        ('registro_ans', pa.string()),
+        ('cd_conta_contabil', pa.string()),
+        ('descricao', pa.string()),
+        ('vl_saldo_final', pa.float64()),
+        ('categoria', pa.string()),
+    ], metadata={'origem': arquivo, 'tamanho': str(tamanho), 'modificado_em': str(modificado_em), 'hash': hash_arquivo})
+    
+    formato = detectar_formato(arquivo)
+    
+    total = 0
+    try:
+        with pq.ParquetWriter(temporario, esquema, use_dictionary=True, compression='zstd') as escritor:
+            for registros, pares, indices, saldos in ler_lotes_demonstracao(arquivo, formato):
+                codigos = [codigo for codigo, _ in pares]
+                classificar_contas(codigos, [descricao for _, descricao in pares], categorias)
+                indices = pa.array(indices)
+                colunas = [
+                    pa.array(registros, pa.string(), from_pandas=True),
+                    pa.array(codigos, pa.string()).take(indices),
+                    pa.array([descricao for _, descricao in pares], pa.string()).take(indices),
+                    pa.array(saldos, pa.float64()),
+                    pa.array([categorias.get(codigo) for codigo in codigos], pa.string()).take(indices),
+                ]
+                escritor.write_table(pa.Table.from_arrays(colunas, schema=esquema))
+                total += len(registros)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    
+    os.replace(temporario, caminho)
+    return total
+
+def importar_demonstracoes_parquet(arquivos_baixados, destino=DIRETORIO_PARQUET):
+    """Importa as demonstrações contábeis para o armazenamento colunar (Parquet).
+
+    Cada trimestre vira uma partição ano=AAAA/trimestre=T; só os arquivos
+    novos ou alterados (pelos metadados da partição) são regravados.
+    """
+    if pa is None:
+        print("pyarrow não está instalado; o armazenamento Parquet não está disponível.")
+        return
+    
+    categorias = {}
+    for ano, trimestre, arquivo in arquivos_baixados:
+        impressao = impressao_parquet(caminho_particao(ano, trimestre, destino), arquivo)
+        if impressao is None:
+            print(f"Arquivo {arquivo} já importado e sem alterações. Pulando.")
+            continue
+        
+        print(f"Importando {arquivo} para Parquet...")
+        try:
+            total = exportar_trimestre_parquet(ano, trimestre, arquivo, impressao, categorias, destino)
+            print(f"Importação de {arquivo} concluída: {total} registros.")
         except Exception as e:
             print(f"Erro ao importar {arquivo}: {e}")
-    
-    conn.close()
 
 def importar_operadoras_ativas(arquivo):
     """Importa os dados das operadoras ativas para o banco de dados"""
@@ -277,59 +1152,37 @@ def importar_operadoras_ativas(arquivo):
     
     conn = sqlite3.connect("ans_database.db")
     
-    # Verificar se já existem dados no banco
-    query = "SELECT COUNT(*) FROM operadoras_ativas"
-    count = pd.read_sql_query(query, conn).iloc[0, 0]
-    
-    if count > 0:
-        print(f"Já existem {count} registros na tabela de operadoras ativas. Pulando importação.")
+    # Só reimporta se o arquivo for novo ou tiver mudado
+    impressao = impressao_digital(conn, arquivo)
+    if impressao is None:
+        print(f"Arquivo {arquivo} já importado e sem alterações. Pulando importação.")
         conn.close()
         return
     
     print(f"Importando {arquivo}...")
     
-    # Detecta encoding e delimitador
-    encoding = detectar_encoding(arquivo)
-    delimitador = detectar_delimitador(arquivo, encoding)
+    # Detecta encoding, delimitador e colunas numa leitura só do início do arquivo
+    formato = detectar_formato(arquivo)
+    
+    # Mapeia as colunas para o modelo do banco de dados pelo cabeçalho
+    colunas_mapeadas = mapear_colunas(formato.colunas, ESQUEMA_OPERADORAS)
+    
+    # Filtra colunas que foram encontradas
+    colunas_validas = {k: v for k, v in colunas_mapeadas.items() if v is not None}
+    
+    if 'registro_ans' not in colunas_validas:
+        print(f"Coluna registro_ans não encontrada em {arquivo}. Pulando.")
+        conn.close()
+        return
+    
+    # Identificadores como texto, para não perder zeros à esquerda do CNPJ
+    identificadores = {colunas_validas[col]: str for col in ('registro_ans', 'cnpj') if col in colunas_validas}
     
     try:
-        # Lê o arquivo CSV
-        df = pd.read_csv(arquivo, delimiter=delimitador, encoding=encoding, low_memory=False)
-        
-        # Padroniza os nomes das colunas
-        colunas = [col.lower() for col in df.columns]
-        df.columns = colunas
-        
-        # Mapeia as colunas para o modelo do banco de dados
-        colunas_mapeadas = {
-            'registro_ans': next((col for col in colunas if 'registro' in col and 'ans' in col), None),
-            'cnpj': next((col for col in colunas if 'cnpj' in col), None),
-            'razao_social': next((col for col in colunas if 'razao' in col and 'social' in col), None),
-            'nome_fantasia': next((col for col in colunas if 'fantasia' in col or 'nome_fantasia' in col), None),
-            'modalidade': next((col for col in colunas if 'modalidade' in col), None),
-            'logradouro': next((col for col in colunas if 'logradouro' in col), None),
-            'numero': next((col for col in colunas if 'numero' in col or 'número' in col), None),
-            'complemento': next((col for col in colunas if 'complemento' in col), None),
-            'bairro': next((col for col in colunas if 'bairro' in col), None),
-            'cidade': next((col for col in colunas if 'cidade' in col or 'municipio' in col), None),
-            'uf': next((col for col in colunas if 'uf' in col or 'estado' in col), None),
-            'cep': next((col for col in colunas if 'cep' in col), None),
-            'ddd': next((col for col in colunas if 'ddd' in col), None),
-            'telefone': next((col for col in colunas if 'telefone' in col or 'fone' in col), None),
-            'fax': next((col for col in colunas if 'fax' in col), None),
-            'email': next((col for col in colunas if 'email' in col or 'e-mail' in col), None),
-            'representante': next((col for col in colunas if 'representante' in col), None),
-            'cargo_representante': next((col for col in colunas if 'cargo' in col), None),
-            'data_registro': next((col for col in colunas if 'registro' in col and 'data' in col), None),
-            'data_atualizacao_dados': next((col for col in colunas if 'atualiza' in col and 'data' in col), None)
-        }
-        
-        # Filtra colunas que foram encontradas
-        colunas_validas = {k: v for k, v in colunas_mapeadas.items() if v is not None}
-        
-        if 'registro_ans' not in colunas_validas:
-            print(f"Coluna registro_ans não encontrada em {arquivo}. Pulando.")
-            return
+        # Lê só as colunas mapeadas do arquivo CSV
+        df = pd.read_csv(arquivo, delimiter=formato.delimitador, encoding=formato.encoding,
+                         encoding_errors=ERROS_ENCODING, usecols=list(colunas_validas.values()),
+                         dtype=identificadores, low_memory=False)
         
         # Cria DataFrame com as colunas padronizadas
         df_padronizado = pd.DataFrame()
@@ -341,7 +1194,10 @@ def importar_operadoras_ativas(arquivo):
         for col in set(colunas_mapeadas.keys()) - set(colunas_validas.keys()):
             df_padronizado[col] = None
         
-        # Importa para o banco de dados
+        # Substitui o cadastro inteiro numa única transação: to_sql faz o
+        # commit do DELETE, do registro e das linhas novas juntos
+        conn.execute("DELETE FROM operadoras_ativas")
+        registrar_importacao(conn, arquivo, impressao, 'operadoras_ativas', len(df_padronizado))
         df_padronizado.to_sql('operadoras_ativas', conn, if_exists='append', index=False)
         
         print(f"Importação de {arquivo} concluída: {len(df_padronizado)} registros.")
@@ -351,15 +1207,19 @@ def importar_operadoras_ativas(arquivo):
     
     conn.close()
 
-def executar_analise_maiores_despesas():
-    """Executa a análise das operadoras com maiores despesas"""
+def maiores_despesas_sqlite():
+    """Top 10 do último trimestre e do último ano, a partir do consolidado no SQLite.
+
+    Devolve (ano, trimestre, df_ultimo_trimestre, df_ultimo_ano) ou None sem dados.
+    """
     conn = sqlite3.connect("ans_database.db")
     
-    # Identifica os valores mais recentes disponíveis
+    garantir_consolidado(conn)
+    
+    # Identifica os valores mais recentes disponíveis (pela chave primária do consolidado)
     query_ultimo_periodo = """
     SELECT ano, trimestre
-    FROM demonstracoes_contabeis
-    GROUP BY ano, trimestre
+    FROM despesas_consolidadas
     ORDER BY ano DESC, trimestre DESC
     LIMIT 1
     """
@@ -367,54 +1227,46 @@ def executar_analise_maiores_despesas():
     ultimo_periodo = pd.read_sql_query(query_ultimo_periodo, conn)
     
     if len(ultimo_periodo) == 0:
-        print("Não há dados disponíveis para análise.")
         conn.close()
-        return
+        return None
     
-    ultimo_ano = ultimo_periodo.iloc[0]['ano']
-    ultimo_trimestre = ultimo_periodo.iloc[0]['trimestre']
-    
-    print(f"\nAnalisando dados do último período disponível: {ultimo_trimestre}T{ultimo_ano}\n")
+    # int() porque o sqlite3 grava numpy.int64 como blob e a consulta não acharia nada
+    ultimo_ano = int(ultimo_periodo.iloc[0]['ano'])
+    ultimo_trimestre = int(ultimo_periodo.iloc[0]['trimestre'])
     
     # 1. As 10 operadoras com maiores despesas em "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR" no último trimestre
+    # (lidas em ordem direto do índice idx_consolidado_categoria)
     query_ultimo_trimestre = """
     SELECT 
         d.registro_ans,
         o.razao_social,
-        d.vl_saldo_final AS valor_despesa
+        d.valor AS valor_despesa
     FROM 
-        demonstracoes_contabeis d
+        despesas_consolidadas d
     LEFT JOIN 
         operadoras_ativas o ON d.registro_ans = o.registro_ans
     WHERE 
-        d.ano = ? AND d.trimestre = ?
-        AND (
-            d.descricao LIKE '%EVENTOS%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%'
-            OR d.descricao LIKE '%EVENTOS/%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%'
-        )
+        d.categoria = ? AND d.ano = ? AND d.trimestre = ?
     ORDER BY 
-        d.vl_saldo_final DESC
+        d.valor DESC
     LIMIT 10
     """
     
-    df_ultimo_trimestre = pd.read_sql_query(query_ultimo_trimestre, conn, params=(ultimo_ano, ultimo_trimestre))
+    df_ultimo_trimestre = pd.read_sql_query(query_ultimo_trimestre, conn,
+                                            params=(CATEGORIA_SINISTROS, ultimo_ano, ultimo_trimestre))
     
     # 2. As 10 operadoras com maiores despesas nessa categoria no último ano
     query_ultimo_ano = """
     SELECT 
         d.registro_ans,
         o.razao_social,
-        SUM(d.vl_saldo_final) AS valor_despesa
+        SUM(d.valor) AS valor_despesa
     FROM 
-        demonstracoes_contabeis d
+        despesas_consolidadas d
     LEFT JOIN 
         operadoras_ativas o ON d.registro_ans = o.registro_ans
     WHERE 
-        d.ano = ?
-        AND (
-            d.descricao LIKE '%EVENTOS%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%'
-            OR d.descricao LIKE '%EVENTOS/%SINISTROS CONHECIDOS OU AVISADOS%ASSISTÊNCIA A SAÚDE MEDICO HOSPITALAR%'
-        )
+        d.categoria = ? AND d.ano = ?
     GROUP BY 
         d.registro_ans, o.razao_social
     ORDER BY 
@@ -422,10 +1274,67 @@ def executar_analise_maiores_despesas():
     LIMIT 10
     """
     
-    df_ultimo_ano = pd.read_sql_query(query_ultimo_ano, conn, params=(ultimo_ano,))
+    df_ultimo_ano = pd.read_sql_query(query_ultimo_ano, conn, params=(CATEGORIA_SINISTROS, ultimo_ano))
+    
+    conn.close()
+    
+    return ultimo_ano, ultimo_trimestre, df_ultimo_trimestre, df_ultimo_ano
+
+def maiores_despesas_parquet(destino=DIRETORIO_PARQUET):
+    """Mesmo resultado de maiores_despesas_sqlite, lendo as partições Parquet.
+
+    O último período sai dos nomes das partições, sem abrir arquivos; os
+    filtros de ano, trimestre e categoria descartam partições e grupos de
+    linhas inteiros antes da leitura, que é feita por mmap.
+    """
+    if pa is None or not os.path.isdir(destino):
+        return None
+    
+    dataset = ds.dataset(destino, format='parquet', partitioning='hive',
+                         filesystem=LocalFileSystem(use_mmap=True))
+    periodos = [ds.get_partition_keys(fragmento.partition_expression) for fragmento in dataset.get_fragments()]
+    if not periodos:
+        return None
+    
+    ultimo = max(periodos, key=lambda chaves: (chaves['ano'], chaves['trimestre']))
+    ultimo_ano, ultimo_trimestre = int(ultimo['ano']), int(ultimo['trimestre'])
+    da_categoria = ds.field('categoria') == CATEGORIA_SINISTROS
+    do_ano = ds.field('ano') == ultimo_ano
     
+    # Razão social vem do cadastro de operadoras, que continua no SQLite
+    conn = sqlite3.connect("ans_database.db")
+    operadoras = pd.read_sql_query("SELECT registro_ans, razao_social FROM operadoras_ativas", conn)
     conn.close()
     
+    def top10(filtro, chaves):
+        tabela = dataset.to_table(columns=['registro_ans', 'cd_conta_contabil', 'vl_saldo_final'], filter=filtro)
+        somas = tabela.group_by(chaves).aggregate([('vl_saldo_final', 'sum')]).to_pandas()
+        somas = somas.rename(columns={'vl_saldo_final_sum': 'valor_despesa'})
+        somas = somas.merge(operadoras, on='registro_ans', how='left')
+        somas = somas.sort_values('valor_despesa', ascending=False, na_position='last', kind='stable').head(10)
+        return somas[['registro_ans', 'razao_social', 'valor_despesa']].reset_index(drop=True)
+    
+    # Por trimestre, soma por operadora e conta, como no consolidado
+    df_ultimo_trimestre = top10(da_categoria & do_ano & (ds.field('trimestre') == ultimo_trimestre),
+                                ['registro_ans', 'cd_conta_contabil'])
+    df_ultimo_ano = top10(da_categoria & do_ano, ['registro_ans'])
+    
+    return ultimo_ano, ultimo_trimestre, df_ultimo_trimestre, df_ultimo_ano
+
+def executar_analise_maiores_despesas(armazenamento=ARMAZENAMENTO):
+    """Executa a análise das operadoras com maiores despesas"""
+    if armazenamento == 'parquet':
+        resultado = maiores_despesas_parquet()
+    else:
+        resultado = maiores_despesas_sqlite()
+    
+    if resultado is None:
+        print("Não há dados disponíveis para análise.")
+        return
+    
+    ultimo_ano, ultimo_trimestre, df_ultimo_trimestre, df_ultimo_ano = resultado
+    print(f"\nAnalisando dados do último período disponível: {ultimo_trimestre}T{ultimo_ano}\n")
+    
     # Formata os valores monetários
     df_ultimo_trimestre['valor_despesa'] = df_ultimo_trimestre['valor_despesa'].apply(
         lambda x: f"R$ {x:,.2f}".replace(',', '_').replace('.', ',').replace('_', '.')
@@ -475,7 +1384,10 @@ def main():
         
         # 4. Importar dados
         print("\nImportando demonstrações contábeis...")
-        importar_demonstracoes_contabeis(arquivos_demonstracoes)
+        if ARMAZENAMENTO == 'parquet':
+            importar_demonstracoes_parquet(arquivos_demonstracoes)
+        else:
+            importar_demonstracoes_contabeis(arquivos_demonstracoes)
         
         print("\nImportando operadoras ativas...")
         importar_operadoras_ativas(arquivo_operadoras)
@@ -0,0 +1 @@
+"""Código compartilhado entre a importação do banco e a API."""
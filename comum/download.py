@@ -0,0 +1,207 @@
+"""Downloads com cache local: revalidação condicional, retomada e novas tentativas.
+
+Usado pelo web scraping (web-scraping/web_scraping.py) e pela importação do
+banco (banco-de-dados/script2.py). Ao lado de cada arquivo baixado fica um
+<arquivo>.http.json com o ETag e o Last-Modified da resposta; na próxima
+execução eles vão em If-None-Match/If-Modified-Since e, se nada mudou no
+servidor, a resposta é um 304 sem corpo. Um download interrompido fica em
+<arquivo>.parcial e continua de onde parou com Range/If-Range.
+"""
+import email.utils
+import http.client
+import json
+import os
+import socket
+import time
+import urllib.error
+import urllib.request
+
+BAIXADO = 'baixado'
+NAO_MODIFICADO = 'nao_modificado'
+
+# Blocos da leitura: começam pequenos e crescem (ou diminuem) conforme a vazão
+TAMANHO_BLOCO_MINIMO = 64 * 1024
+TAMANHO_BLOCO_MAXIMO = 4 * 1024 * 1024
+
+# Tempo de leitura de um bloco abaixo do qual ele dobra, e acima do qual cai pela metade
+TEMPO_BLOCO_RAPIDO = 0.1
+TEMPO_BLOCO_LENTO = 1.0
+
+TENTATIVAS = 4
+ESPERA_INICIAL = 1.0  # segundos; dobra a cada nova tentativa
+TIMEOUT = 60
+
+# Respostas que valem nova tentativa; os demais erros HTTP são definitivos
+STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+SUFIXO_METADADOS = '.http.json'
+SUFIXO_PARCIAL = '.parcial'
+
+# Falhas de rede que valem nova tentativa; as demais (arquivo inexistente num
+# file://, esquema desconhecido, erro de disco...) são definitivas
+ERROS_TRANSITORIOS = (ConnectionError, TimeoutError, socket.gaierror, http.client.HTTPException)
+
+
+class DownloadIncompleto(Exception):
+    """O corpo recebido não bate com o tamanho anunciado; a próxima tentativa retoma o parcial"""
+
+
+def _ler_json(caminho):
+    try:
+        with open(caminho, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_json(caminho, dados):
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f)
+    os.replace(temporario, caminho)
+
+
+def _validadores(resposta):
+    return {
+        'etag': resposta.headers.get('ETag'),
+        'last_modified': resposta.headers.get('Last-Modified'),
+    }
+
+
+def _mesma_versao(validadores, metadados):
+    """A resposta é da mesma versão registrada (pelo ETag ou, sem ele, pelo Last-Modified)?"""
+    if not metadados:
+        return False
+    if validadores['etag'] and metadados.get('etag'):
+        return validadores['etag'] == metadados['etag']
+    return bool(validadores['last_modified']) and validadores['last_modified'] == metadados.get('last_modified')
+
+
+def _cabecalhos_condicionais(destino, url, metadados, parcial, metadados_parcial):
+    """Cabeçalhos de retomada (se houver parcial) ou de revalidação (se houver arquivo completo)"""
+    cabecalhos = {}
+
+    if os.path.exists(parcial) and metadados_parcial and metadados_parcial.get('url') == url:
+        validador = metadados_parcial.get('etag') or metadados_parcial.get('last_modified')
+        tamanho = os.path.getsize(parcial)
+        if validador and tamanho:
+            cabecalhos['Range'] = f'bytes={tamanho}-'
+            cabecalhos['If-Range'] = validador
+            return cabecalhos
+
+    if not os.path.exists(destino):
+        return cabecalhos
+
+    if metadados and metadados.get('url') == url:
+        if metadados.get('etag'):
+            cabecalhos['If-None-Match'] = metadados['etag']
+        if metadados.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = metadados['last_modified']
+    else:
+        # Arquivo baixado antes do cache existir: vale a data de modificação local
+        cabecalhos['If-Modified-Since'] = email.utils.formatdate(os.path.getmtime(destino), usegmt=True)
+    return cabecalhos
+
+
+def _copiar_corpo(resposta, arquivo):
+    """Copia o corpo em blocos de tamanho adaptativo; devolve o número de bytes"""
+    tamanho_bloco = TAMANHO_BLOCO_MINIMO
+    total = 0
+
+    while True:
+        inicio = time.monotonic()
+        bloco = resposta.read(tamanho_bloco)
+        if not bloco:
+            return total
+        arquivo.write(bloco)
+        total += len(bloco)
+
+        duracao = time.monotonic() - inicio
+        if duracao < TEMPO_BLOCO_RAPIDO and len(bloco) == tamanho_bloco:
+            tamanho_bloco = min(tamanho_bloco * 2, TAMANHO_BLOCO_MAXIMO)
+        elif duracao > TEMPO_BLOCO_LENTO:
+            tamanho_bloco = max(tamanho_bloco // 2, TAMANHO_BLOCO_MINIMO)
+
+
+def _tentar(url, destino, cabecalhos_extras, timeout):
+    """Uma requisição: devolve BAIXADO ou NAO_MODIFICADO, ou levanta o erro"""
+    caminho_metadados = destino + SUFIXO_METADADOS
+    parcial = destino + SUFIXO_PARCIAL
+    caminho_metadados_parcial = parcial + SUFIXO_METADADOS
+    metadados = _ler_json(caminho_metadados) if os.path.exists(destino) else None
+    metadados_parcial = _ler_json(caminho_metadados_parcial)
+
+    cabecalhos = dict(cabecalhos_extras or {})
+    cabecalhos.update(_cabecalhos_condicionais(destino, url, metadados, parcial, metadados_parcial))
+    requisicao = urllib.request.Request(url, headers=cabecalhos)
+
+    try:
+        resposta = urllib.request.urlopen(requisicao, timeout=timeout)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return NAO_MODIFICADO
+        if e.code == 416 and 'Range' in cabecalhos:
+            # O parcial não corresponde mais ao arquivo do servidor: recomeça do zero
+            os.remove(parcial)
+        raise
+
+    with resposta:
+        validadores = _validadores(resposta)
+        status = getattr(resposta, 'status', None) or 200
+
+        # Servidor que ignora as condicionais (ou file://) mas devolve a mesma versão:
+        # o corpo nem é lido
+        if status == 200 and 'Range' not in cabecalhos and os.path.exists(destino) \
+                and _mesma_versao(validadores, metadados):
+            return NAO_MODIFICADO
+
+        if status == 206:
+            inicio_parcial = int(resposta.headers.get('Content-Range', 'bytes 0-').split()[1].split('-')[0])
+            if inicio_parcial != os.path.getsize(parcial):
+                raise DownloadIncompleto(f"Content-Range inesperado: {resposta.headers.get('Content-Range')}")
+            modo = 'ab'
+            esperado = resposta.headers.get('Content-Range', '').rpartition('/')[2]
+        else:
+            modo = 'wb'
+            esperado = resposta.headers.get('Content-Length')
+            _gravar_json(caminho_metadados_parcial, dict(validadores, url=url))
+
+        with open(parcial, modo) as arquivo:
+            _copiar_corpo(resposta, arquivo)
+
+    if esperado and esperado.isdigit() and os.path.getsize(parcial) != int(esperado):
+        raise DownloadIncompleto(f"Download incompleto: {os.path.getsize(parcial)} de {esperado} bytes")
+
+    metadados_novos = _ler_json(caminho_metadados_parcial) or dict(validadores, url=url)
+    os.replace(parcial, destino)
+    _gravar_json(caminho_metadados, metadados_novos)
+    os.remove(caminho_metadados_parcial)
+    return BAIXADO
+
+
+def _transitorio(erro):
+    if isinstance(erro, urllib.error.HTTPError):
+        return erro.code in STATUS_TRANSITORIOS or erro.code == 416
+    if isinstance(erro, urllib.error.URLError):
+        erro = erro.reason
+    return isinstance(erro, (DownloadIncompleto,) + ERROS_TRANSITORIOS)
+
+
+def baixar(url, destino, cabecalhos=None, tentativas=TENTATIVAS, timeout=TIMEOUT):
+    """Baixa `url` para `destino` se o servidor tiver uma versão diferente da local.
+
+    Devolve BAIXADO ou NAO_MODIFICADO. Falhas de rede e respostas
+    transitórias (5xx, 408, 429) são repetidas com espera crescente, e cada
+    nova tentativa retoma o parcial em vez de começar de novo; os demais
+    erros são levantados na hora.
+    """
+    os.makedirs(os.path.dirname(destino) or '.', exist_ok=True)
+
+    for tentativa in range(tentativas):
+        try:
+            return _tentar(url, destino, cabecalhos, timeout)
+        except Exception as e:
+            if not _transitorio(e) or tentativa + 1 == tentativas:
+                raise
+
+        time.sleep(ESPERA_INICIAL * 2 ** tentativa)
@@ -0,0 +1,142 @@
+"""Detecção do formato de arquivos CSV (encoding, delimitador e colunas).
+
+Usado pela importação do banco (banco-de-dados/script2.py) e pela API
+(api/registro.py). Tudo sai de uma única leitura de uma amostra limitada do
+início do arquivo; o resultado fica guardado pela impressão do arquivo
+(caminho, tamanho e mtime), então a mesma versão nunca é analisada de novo.
+Quem lê o CSV passa encoding_errors=ERROS_ENCODING: um byte que não é UTF-8
+válido depois da amostra é lido como latin1 na própria leitura, sem uma
+segunda passada pelo arquivo.
+"""
+import codecs
+import csv
+import os
+import re
+import threading
+import unicodedata
+from collections import namedtuple
+
+# Bytes lidos do início do arquivo para decidir o formato
+TAMANHO_AMOSTRA = 1024 * 1024
+
+# latin1 decodifica qualquer sequência de bytes, então é sempre o último recurso
+ENCODINGS = ['utf-8', 'latin1']
+
+DELIMITADORES = [';', ',', '\t', '|']
+
+# Quantidade máxima de formatos guardados por processo
+MAXIMO_CACHE = 256
+
+# Tratamento de erros de decodificação para o encoding_errors do read_csv
+ERROS_ENCODING = 'utf8_ou_latin1'
+
+FormatoCSV = namedtuple('FormatoCSV', ['encoding', 'delimitador', 'colunas'])
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def normalizar_coluna(nome):
+    """Nome de coluna comparável: sem acentos, minúsculo e com '_' entre as palavras"""
+    nome = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', nome.lower()).strip('_')
+
+
+def _decodificar_como_latin1(erro):
+    """Bytes que não formam UTF-8 válido viram os caracteres latin1 correspondentes"""
+    if not isinstance(erro, UnicodeDecodeError):
+        raise erro
+    return erro.object[erro.start:erro.end].decode('latin1'), erro.end
+
+
+codecs.register_error(ERROS_ENCODING, _decodificar_como_latin1)
+
+
+def _detectar_encoding(amostra):
+    """UTF-8 se a amostra for UTF-8 válida; senão latin1.
+
+    O resto do arquivo não é conferido: um byte inválido que só aparece
+    depois da amostra é tratado por ERROS_ENCODING durante a leitura.
+    """
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    # Incremental: um caractere cortado no fim da amostra não conta como erro
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(amostra)
+    except UnicodeDecodeError:
+        return ENCODINGS[-1]
+    return ENCODINGS[0]
+
+
+def _detectar_delimitador(cabecalho):
+    """O delimitador que mais aparece no cabeçalho (em empate, vale a ordem de DELIMITADORES)"""
+    contagens = [cabecalho.count(delimitador) for delimitador in DELIMITADORES]
+    if max(contagens) == 0:
+        return DELIMITADORES[0]
+    return DELIMITADORES[contagens.index(max(contagens))]
+
+
+def _analisar(caminho):
+    with open(caminho, 'rb') as arquivo:
+        amostra = arquivo.read(TAMANHO_AMOSTRA)
+    encoding = _detectar_encoding(amostra)
+
+    texto = amostra.decode(encoding, errors='ignore')
+    cabecalho = texto.splitlines()[0] if texto else ''
+    delimitador = _detectar_delimitador(cabecalho)
+    colunas = next(csv.reader([cabecalho], delimiter=delimitador), [])
+
+    return FormatoCSV(encoding, delimitador, [coluna.strip() for coluna in colunas])
+
+
+def detectar_formato(caminho):
+    """Encoding, delimitador e nomes das colunas do CSV, guardados pela impressão do arquivo"""
+    info = os.stat(caminho)
+    chave = (os.path.abspath(caminho), info.st_size, info.st_mtime_ns)
+
+    formato = _cache.get(chave)
+    if formato is not None:
+        return formato
+
+    formato = _analisar(caminho)
+    with _lock:
+        if len(_cache) >= MAXIMO_CACHE:
+            _cache.pop(next(iter(_cache)))
+        _cache[chave] = formato
+    return formato
+
+
+def mapear_colunas(colunas, esquema):
+    """Resolve cada campo do esquema para o nome original de uma coluna do arquivo.
+
+    O esquema lista, por campo, os nomes aceitos em ordem de preferência
+    (já normalizados). Primeiro vale o nome exato; depois, a coluna que
+    contém todas as palavras do nome. Cada coluna atende a um campo só, e
+    campos sem coluna ficam com None.
+    """
+    normalizadas = {}
+    for coluna in colunas:
+        normalizadas.setdefault(normalizar_coluna(coluna), coluna)
+    usadas = set()
+    mapa = {}
+
+    # Nomes exatos primeiro, para que um campo não tome a coluna exata de outro
+    for campo, nomes in esquema.items():
+        mapa[campo] = next((normalizadas[nome] for nome in nomes
+                            if nome in normalizadas and normalizadas[nome] not in usadas), None)
+        if mapa[campo] is not None:
+            usadas.add(mapa[campo])
+
+    for campo, nomes in esquema.items():
+        if mapa[campo] is not None:
+            continue
+        for nome in nomes:
+            palavras = set(nome.split('_'))
+            mapa[campo] = next((original for normalizada, original in normalizadas.items()
+                                if original not in usadas and palavras <= set(normalizada.split('_'))), None)
+            if mapa[campo] is not None:
+                usadas.add(mapa[campo])
+                break
+
+    return mapa
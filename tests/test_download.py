@@ -0,0 +1,192 @@
+"""Testes de comum/download.py contra um servidor HTTP local (python -m pytest tests)."""
+import hashlib
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import urllib.error
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from comum import download
+from comum.download import BAIXADO, NAO_MODIFICADO, SUFIXO_METADADOS, SUFIXO_PARCIAL, baixar
+
+
+class ServidorArquivos(http.server.BaseHTTPRequestHandler):
+    """Serve `arquivos` com ETag, If-None-Match, Range/If-Range e falhas programadas"""
+
+    arquivos = {}
+    requisicoes = []
+    falhas = []  # status devolvidos (um por requisição) antes de servir de verdade
+    ignora_condicionais = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.requisicoes.append((self.path, dict(self.headers)))
+
+        if self.falhas:
+            self.send_response(self.falhas.pop(0))
+            self.end_headers()
+            return
+
+        corpo = self.arquivos.get(self.path)
+        if corpo is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = '"' + hashlib.sha256(corpo).hexdigest()[:16] + '"'
+        if not self.ignora_condicionais:
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            faixa = self.headers.get('Range')
+            if faixa and self.headers.get('If-Range') == etag:
+                inicio = int(faixa.split('=')[1].rstrip('-'))
+                self.send_response(206)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Range', f'bytes {inicio}-{len(corpo) - 1}/{len(corpo)}')
+                self.send_header('Content-Length', str(len(corpo) - inicio))
+                self.end_headers()
+                self.wfile.write(corpo[inicio:])
+                return
+
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class TestBaixar(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ServidorArquivos)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.servidor.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.pasta = tempfile.TemporaryDirectory()
+        self.destino = os.path.join(self.pasta.name, 'arquivo.bin')
+        self.url = self.base + '/arquivo.bin'
+        self.corpo = os.urandom(300_000)
+        ServidorArquivos.arquivos = {'/arquivo.bin': self.corpo}
+        ServidorArquivos.requisicoes = []
+        ServidorArquivos.falhas = []
+        ServidorArquivos.ignora_condicionais = False
+        self.espera_original = download.ESPERA_INICIAL
+        download.ESPERA_INICIAL = 0.01
+
+    def tearDown(self):
+        download.ESPERA_INICIAL = self.espera_original
+        self.pasta.cleanup()
+
+    def ler_destino(self):
+        with open(self.destino, 'rb') as f:
+            return f.read()
+
+    def test_primeiro_download_grava_arquivo_e_validadores(self):
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        self.assertEqual(self.ler_destino(), self.corpo)
+        with open(self.destino + SUFIXO_METADADOS, encoding='utf-8') as f:
+            metadados = json.load(f)
+        self.assertEqual(metadados['url'], self.url)
+        self.assertTrue(metadados['etag'])
+        self.assertFalse(os.path.exists(self.destino + SUFIXO_PARCIAL))
+
+    def test_revalidacao_sem_mudanca_recebe_304(self):
+        baixar(self.url, self.destino)
+        ServidorArquivos.requisicoes = []
+
+        self.assertEqual(baixar(self.url, self.destino), NAO_MODIFICADO)
+        (_, cabecalhos), = ServidorArquivos.requisicoes
+        self.assertIn('If-None-Match', cabecalhos)
+        self.assertEqual(self.ler_destino(), self.corpo)
+
+    def test_arquivo_alterado_no_servidor_e_baixado_de_novo(self):
+        baixar(self.url, self.destino)
+        ServidorArquivos.arquivos['/arquivo.bin'] = b'nova versao'
+
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        self.assertEqual(self.ler_destino(), b'nova versao')
+
+    def test_retoma_parcial_com_range(self):
+        baixar(self.url, self.destino)
+        with open(self.destino + SUFIXO_METADADOS, encoding='utf-8') as f:
+            metadados = json.load(f)
+        os.remove(self.destino)
+        os.remove(self.destino + SUFIXO_METADADOS)
+
+        # Download interrompido depois de 100 000 bytes
+        parcial = self.destino + SUFIXO_PARCIAL
+        with open(parcial, 'wb') as f:
+            f.write(self.corpo[:100_000])
+        with open(parcial + SUFIXO_METADADOS, 'w', encoding='utf-8') as f:
+            json.dump(metadados, f)
+        ServidorArquivos.requisicoes = []
+
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        (_, cabecalhos), = ServidorArquivos.requisicoes
+        self.assertEqual(cabecalhos['Range'], 'bytes=100000-')
+        self.assertEqual(self.ler_destino(), self.corpo)
+        self.assertFalse(os.path.exists(parcial))
+        self.assertFalse(os.path.exists(parcial + SUFIXO_METADADOS))
+
+    def test_parcial_de_outra_versao_recomeca_do_zero(self):
+        parcial = self.destino + SUFIXO_PARCIAL
+        with open(parcial, 'wb') as f:
+            f.write(b'x' * 100_000)
+        with open(parcial + SUFIXO_METADADOS, 'w', encoding='utf-8') as f:
+            json.dump({'etag': '"versao-antiga"', 'last_modified': None, 'url': self.url}, f)
+
+        # If-Range não bate: o servidor responde 200 com o arquivo inteiro
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        self.assertEqual(self.ler_destino(), self.corpo)
+
+    def test_servidor_que_ignora_condicionais_com_mesmo_etag(self):
+        baixar(self.url, self.destino)
+        ServidorArquivos.ignora_condicionais = True
+
+        self.assertEqual(baixar(self.url, self.destino), NAO_MODIFICADO)
+
+        # ETag diferente do registrado: é outra versão
+        ServidorArquivos.arquivos['/arquivo.bin'] = b'nova versao'
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        self.assertEqual(self.ler_destino(), b'nova versao')
+
+    def test_falhas_transitorias_sao_repetidas(self):
+        ServidorArquivos.falhas = [503, 502]
+
+        self.assertEqual(baixar(self.url, self.destino), BAIXADO)
+        self.assertEqual(len(ServidorArquivos.requisicoes), 3)
+
+    def test_404_nao_e_repetido(self):
+        with self.assertRaises(urllib.error.HTTPError):
+            baixar(self.base + '/inexistente.zip', self.destino)
+        self.assertEqual(len(ServidorArquivos.requisicoes), 1)
+
+    def test_file_inexistente_falha_sem_novas_tentativas(self):
+        download.ESPERA_INICIAL = 5.0
+        inicio = time.monotonic()
+        with self.assertRaises(urllib.error.URLError):
+            baixar('file://' + os.path.join(self.pasta.name, 'inexistente.csv'), self.destino)
+        self.assertLess(time.monotonic() - inicio, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
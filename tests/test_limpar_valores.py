@@ -0,0 +1,120 @@
+"""Equivalência de limpar_valores com limpar_valor em banco-de-dados/script2.py (python -m pytest tests)."""
+import os
+import random
+import sys
+import unittest
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'banco-de-dados'))
+
+import script2
+from script2 import LARGURA_MAXIMA_VALOR, limpar_valor, limpar_valores
+
+# Casos que já separaram as duas implementações, ou que ficam na fronteira das regras
+CASOS_LIMITE = [
+    '', None, '-', '-.', '.', ',', '1,2,3', '1.2.3', '1.234', '1.234,56', '-1.234,56', 'R$ 1.234,56',
+    ' 12 ', '1 2', '1e5', '1E5', 'inf', '-inf', 'nan', 'NaN', '+5', '-0', '-0,00', '0', '007', '.5', '-.5',
+    '5.', '5,', '5-', '--5', '1-2', '-5-', '(1.234,56)', '1.234.567,89', '١٢', '١٢,٥', '12 345,6',
+    'ç1,5', '1' * (LARGURA_MAXIMA_VALOR + 1), '1,' + '0' * 40, '-' + '9' * 30 + ',5', '9' * 400,
+]
+
+# Alfabeto do sorteio: o que limpar_valor mantém, mais o que ele descarta ou o float() recusaria
+ALFABETO = list('0123456789') * 3 + list(',.-') * 3 + list(' eE+R$a_') + ['ç', '١', ' ']
+
+
+def textos_aleatorios(gerador, quantidade):
+    textos = []
+    for _ in range(quantidade):
+        if gerador.random() < 0.05:
+            textos.append(None)
+        else:
+            tamanho = gerador.choice([gerador.randint(0, 8), gerador.randint(0, 40)])
+            textos.append(''.join(gerador.choice(ALFABETO) for _ in range(tamanho)))
+    return textos
+
+
+def numeros_brasileiros(gerador, quantidade):
+    """Saldos como nos arquivos da ANS: 1234,56 ou 1.234,56, com algumas células vazias"""
+    numeros = []
+    for _ in range(quantidade):
+        valor = gerador.uniform(-1e9, 1e9)
+        if gerador.random() < 0.02:
+            numeros.append('')
+        elif gerador.random() < 0.5:
+            numeros.append(f'{valor:.2f}'.replace('.', ','))
+        else:
+            numeros.append(f'{valor:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.'))
+    return numeros
+
+
+class TestLimparValores(unittest.TestCase):
+
+    def assertEquivalente(self, serie):
+        esperado = np.array([limpar_valor(valor) for valor in serie.tolist()], dtype=float)
+        obtido = limpar_valores(serie)
+        self.assertEqual(obtido.dtype, np.float64)
+        self.assertTrue(obtido.index.equals(serie.index))
+        obtido = obtido.to_numpy()
+        diferentes = np.flatnonzero((obtido != esperado) | (np.signbit(obtido) != np.signbit(esperado)))
+        self.assertEqual(len(diferentes), 0,
+                         [(serie.iloc[i], obtido[i], esperado[i]) for i in diferentes[:10]])
+
+    def assertEquivalenteEmTodosOsTipos(self, valores):
+        for tipo in (object, 'str', 'string'):
+            with self.subTest(tipo=tipo):
+                self.assertEquivalente(pd.Series(valores, dtype=tipo))
+
+    def test_casos_limite(self):
+        self.assertEquivalenteEmTodosOsTipos(CASOS_LIMITE)
+
+    def test_casos_limite_isolados(self):
+        # Cada caso sozinho na coluna exercita o caminho rápido e o geral
+        for valor in CASOS_LIMITE:
+            with self.subTest(valor=valor):
+                self.assertEquivalenteEmTodosOsTipos([valor, '1,5'])
+
+    def test_textos_aleatorios(self):
+        gerador = random.Random(12)
+        for _ in range(20):
+            self.assertEquivalenteEmTodosOsTipos(textos_aleatorios(gerador, 2000))
+
+    def test_numeros_brasileiros(self):
+        gerador = random.Random(7)
+        self.assertEquivalenteEmTodosOsTipos(numeros_brasileiros(gerador, 20000))
+
+    def test_numeros_com_uma_celula_estranha_no_fim(self):
+        # O caminho rápido tem que olhar a coluna inteira, não só a amostra do início
+        gerador = random.Random(3)
+        numeros = [f'{gerador.uniform(-1e6, 1e6):.2f}'.replace('.', ',') for _ in range(20000)]
+        for estranho in ('1e5', 'inf', '+5', ' 12', '-', '1,2,3', '1.234,5', '١٢', ''):
+            with self.subTest(estranho=estranho):
+                self.assertEquivalenteEmTodosOsTipos(numeros + [estranho])
+
+    def test_coluna_numerica(self):
+        self.assertEquivalente(pd.Series([1.5, None, -0.0, 3]))
+        self.assertEquivalente(pd.Series([1, 2, 3]))
+        self.assertEquivalente(pd.Series([True, False]))
+
+    def test_coluna_com_tipos_misturados(self):
+        self.assertEquivalente(pd.Series(['1,5', 2, 2.5, None, float('nan'), '3.000,25'], dtype=object))
+
+    def test_coluna_vazia_e_so_nulos(self):
+        self.assertEquivalente(pd.Series([], dtype=object))
+        self.assertEquivalente(pd.Series([], dtype='str'))
+        self.assertEquivalente(pd.Series([None, None], dtype=object))
+
+    def test_indice_preservado(self):
+        serie = pd.Series(['1,5', 'x', '2.000,5'], index=[10, 5, 7], dtype='str')
+        self.assertEquivalente(serie)
+
+    @unittest.skipIf(script2.pa is None, 'pyarrow não instalado')
+    def test_recorte_de_coluna_arrow(self):
+        # Séries que começam no meio do buffer do Arrow (offset diferente de zero)
+        serie = pd.Series(numeros_brasileiros(random.Random(5), 1000) + CASOS_LIMITE, dtype='string[pyarrow]')
+        self.assertEquivalente(serie.iloc[333:])
+
+
+if __name__ == '__main__':
+    unittest.main()
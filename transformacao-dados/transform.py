@@ -1,5 +1,3 @@
-import requests
-import pandas as pd
 import fitz  # PyMuPDF
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
@@ -7,67 +5,344 @@ import re
 import io
 import zipfile
 import os
+import sys
+import csv
+import hashlib
+import unicodedata
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Downloads condicionais compartilhados (pasta comum/ na raiz do repositório)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from comum.download import NAO_MODIFICADO, baixar
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow é opcional; sem ele a extração roda sempre, sem cache
+    pa = None
+
+DATE_PATTERN = re.compile(r'\d{2}/\d{2}/\d{4}')
+LEGEND_PATTERN = re.compile(r'(\S+) - (.+)')
+
+# Colunas da tabela do Rol, na ordem do CSV gerado
+TABLE_COLUMNS = ['PROCEDIMENTO', 'RN (alteração)', 'VIGÊNCIA', 'OD', 'AMB', 'HCO', 'HSO',
+                 'REF', 'PAC', 'DUT', 'SUBGRUPO', 'GRUPO', 'CAPÍTULO']
+
+# Colunas cujas abreviações são trocadas pela descrição da legenda
+ABBREVIATION_COLUMNS = ['OD', 'AMB']
+
+# Distância máxima (em pontos) entre bordas desenhadas que contam como a mesma linha da grade
+GRID_TOLERANCE = 2
+
+# Faixas de páginas por processo: mais faixas que processos equilibram páginas de tamanhos diferentes
+RANGES_PER_WORKER = 4
+
+# Tabelas já extraídas, uma por conteúdo de PDF e versão do extrator
+CACHE_DIR = os.environ.get('TRANSFORM_CACHE_DIR', 'cache_extracao')
 
 def download_pdf(pdf_url, filename):
-    """Baixa o PDF e salva localmente."""
-    response = requests.get(pdf_url)
-    if response.status_code == 200:
-        with open(filename, 'wb') as f:
-            f.write(response.content)
-        return filename
-    else:
-        raise ValueError("Falha no download do PDF.")
+    """Baixa o PDF e salva localmente; se ele não mudou no servidor, nada é transferido."""
+    try:
+        status = baixar(pdf_url, filename)
+    except Exception as e:
+        raise ValueError(f"Falha no download do PDF: {e}") from e
+    if status == NAO_MODIFICADO:
+        print(f"PDF '{filename}' sem alterações no servidor.")
+    return filename
+
+def header_key(text):
+    """Primeira palavra do cabeçalho, sem acentos e em maiúsculas ('RN (alteração)' -> 'RN')."""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').upper()
+    match = re.match(r'\s*([A-Z0-9]+)', text)
+    return match.group(1) if match else ''
+
+COLUMN_KEYS = {header_key(column): position for position, column in enumerate(TABLE_COLUMNS)}
+ABBREVIATION_POSITIONS = [TABLE_COLUMNS.index(column) for column in ABBREVIATION_COLUMNS]
 
-def extract_text_from_pdf(pdf_path):
-    """Extrai texto do PDF."""
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text("text") for page in doc)
-    return text
+def cluster(values, tolerance=GRID_TOLERANCE):
+    """Junta coordenadas próximas, devolvendo as bordas da grade em ordem."""
+    edges = []
+    for value in sorted(values):
+        if not edges or value - edges[-1] > tolerance:
+            edges.append(value)
+    return edges
 
-def parse_text_to_dataframe(text):
-    """Converte texto em DataFrame estruturado."""
-    lines = text.split("\n")
-    data = []
+def table_grid(page):
+    """Bordas verticais e horizontais das células, a partir das linhas desenhadas na página."""
+    xs, ys = [], []
     
-    for line in lines:
-        if re.search(r'\d{2}/\d{2}/\d{4}', line):  # Se contém data, assume que é uma linha válida
-            data.append(line.split())
+    for drawing in page.get_drawings():
+        for item in drawing["items"]:
+            if item[0] == "re":
+                rect = item[1]
+                xs.extend((rect.x0, rect.x1))
+                ys.extend((rect.y0, rect.y1))
+            elif item[0] == "l":
+                start, end = item[1], item[2]
+                if abs(start.x - end.x) <= GRID_TOLERANCE:
+                    xs.append(start.x)
+                elif abs(start.y - end.y) <= GRID_TOLERANCE:
+                    ys.append(start.y)
+    
+    return cluster(xs), cluster(ys)
+
+def page_cells(page):
+    """Texto de cada célula da grade, como {linha: {coluna: texto}}."""
+    xs, ys = table_grid(page)
+    cells = {}
+    
+    for x0, y0, x1, y1, word, *_ in page.get_text("words"):
+        column = bisect_right(xs, (x0 + x1) / 2) - 1
+        row = bisect_right(ys, (y0 + y1) / 2) - 1
+        if 0 <= column < len(xs) - 1 and 0 <= row < len(ys) - 1:
+            cells.setdefault(row, {}).setdefault(column, []).append(word)
+    
+    return {row: {column: ' '.join(words) for column, words in columns.items()}
+            for row, columns in sorted(cells.items())}, len(xs) - 1
+
+def match_header(columns):
+    """Posição no esquema de cada coluna da grade, se a linha for o cabeçalho da tabela."""
+    mapping = {}
+    for column, text in columns.items():
+        position = COLUMN_KEYS.get(header_key(text))
+        if position is not None and position not in mapping.values():
+            mapping[column] = position
+    return mapping if len(mapping) >= len(TABLE_COLUMNS) // 2 else None
+
+def parse_page(page, codes):
+    """Extrai as linhas da tabela de uma página já no esquema de TABLE_COLUMNS.
+    
+    As células saem da grade desenhada; o cabeçalho diz qual coluna da
+    grade é qual. As abreviações de OD e AMB viram códigos (ver
+    build_categories) aqui mesmo, na extração.
+    """
+    cells, column_count = page_cells(page)
+    mapping = None
+    rows = []
+    
+    # Página sem cabeçalho: vale a ordem das colunas, se a grade tiver o mesmo número delas
+    if column_count == len(TABLE_COLUMNS):
+        mapping = {column: column for column in range(column_count)}
+    
+    for columns in cells.values():
+        # Só entram linhas com data, como a vigência; das outras, só interessa o cabeçalho
+        if not any(DATE_PATTERN.search(text) for text in columns.values()):
+            mapping = match_header(columns) or mapping
+            continue
+        
+        if mapping is None:
+            continue
+        
+        row = [''] * len(TABLE_COLUMNS)
+        for column, text in columns.items():
+            if column in mapping:
+                row[mapping[column]] = text
+        for position in ABBREVIATION_POSITIONS:
+            row[position] = codes.get(row[position], row[position])
+        rows.append(row)
+    
+    return rows
+
+def extract_page_range(pdf_path, start, stop, codes):
+    """Processa as páginas [start, stop) abrindo o documento no próprio processo."""
+    with fitz.open(pdf_path) as doc:
+        return [parse_page(doc[number], codes) for number in range(start, stop)]
+
+def page_ranges(page_count, parts):
+    """Divide as páginas em até `parts` faixas contíguas de tamanhos parecidos."""
+    parts = max(1, min(parts, page_count))
+    bounds = [page_count * i // parts for i in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def iter_pages(pdf_path, codes, workers=None):
+    """Gera as linhas de cada página do PDF, na ordem das páginas.
+    
+    Com mais de um processo, as faixas de páginas são lidas em paralelo,
+    mas só algumas ficam em andamento por vez: a memória é limitada pelas
+    faixas em voo, não pelo documento inteiro.
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, page_count)
     
-    df = pd.DataFrame(data)
-    return df
+    if workers <= 1:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield parse_page(page, codes)
+        return
+    
+    ranges = iter(page_ranges(page_count, workers * RANGES_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(extract_page_range, pdf_path, start, stop, codes)
+                        for start, stop in islice(ranges, workers * 2))
+        while pending:
+            pages = pending.popleft().result()
+            for start, stop in islice(ranges, 1):
+                pending.append(executor.submit(extract_page_range, pdf_path, start, stop, codes))
+            yield from pages
+
+def iter_rows(pdf_path, codes, workers=None):
+    """Gera as linhas da tabela página a página."""
+    for rows in iter_pages(pdf_path, codes, workers):
+        yield from rows
 
-def extract_legends(text):
+def extract_legends(lines):
     """Extrai legendas do rodapé do PDF."""
     legends = {}
     legend_section = False
     
-    for line in text.split("\n"):
+    for line in lines:
         if "LEGENDAS" in line.upper():
             legend_section = True
             continue
         
         if legend_section:
-            match = re.match(r'(\S+) - (.+)', line)
+            match = LEGEND_PATTERN.match(line)
             if match:
                 legends[match.group(1)] = match.group(2)
     
     return legends
 
-def replace_abbreviations(df, legends):
-    """Substitui abreviações nas colunas 'OD' e 'AMB'."""
-    for col in ['OD', 'AMB']:
-        if col in df.columns:
-            df[col] = df[col].map(legends).fillna(df[col])
-    return df
+def find_legends(pdf_path):
+    """Localiza o bloco de legendas lendo as páginas a partir do fim.
+    
+    A leitura para na página (de trás para frente) que contém "LEGENDAS",
+    em vez de percorrer o documento inteiro antes da extração da tabela.
+    """
+    lines = []
+    
+    with fitz.open(pdf_path) as doc:
+        for number in range(doc.page_count - 1, -1, -1):
+            text = doc[number].get_text("text")
+            lines[:0] = text.split("\n")
+            if "LEGENDAS" in text.upper():
+                return extract_legends(lines)
+    
+    return {}
 
-def save_csv_and_zip(df, csv_filename, zip_filename):
-    """Salva o DataFrame em CSV e compacta em um ZIP."""
-    df.to_csv(csv_filename, index=False, sep=';')
+def build_categories(legends):
+    """Categorias das colunas de abreviação: códigos inteiros e as descrições correspondentes.
     
+    O código 0 é a célula vazia; cada abreviação da legenda tem o seu. Um
+    valor fora da legenda segue como texto.
+    """
+    abbreviations = [''] + list(legends)
+    categories = [''] + list(legends.values())
+    codes = {abbreviation: code for code, abbreviation in enumerate(abbreviations)}
+    return categories, codes
+
+def write_csv_to_zip(rows, categories, csv_filename, zip_filename):
+    """Escreve as linhas em CSV direto na entrada do ZIP, sem arquivo temporário."""
     with zipfile.ZipFile(zip_filename, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        zipf.write(csv_filename, os.path.basename(csv_filename))
+        with zipf.open(os.path.basename(csv_filename), 'w') as entry:
+            with io.TextIOWrapper(entry, encoding='utf-8', newline='') as text:
+                writer = csv.writer(text, delimiter=';', lineterminator='\n')
+                writer.writerow(TABLE_COLUMNS)
+                for row in rows:
+                    for position in ABBREVIATION_POSITIONS:
+                        if isinstance(row[position], int):
+                            row[position] = categories[row[position]]
+                    writer.writerow(row)
+
+def parser_version():
+    """Versão das regras de extração: hash deste arquivo e da versão do PyMuPDF.
     
-    os.remove(csv_filename)  # Remove CSV após compactação
+    Qualquer mudança no extrator (esquema, grade, legendas) muda a versão
+    e invalida o cache sem precisar lembrar de incrementar um número.
+    """
+    digest = hashlib.sha256()
+    with open(os.path.abspath(__file__), 'rb') as f:
+        digest.update(f.read())
+    digest.update(fitz.VersionBind.encode())
+    return digest.hexdigest()[:16]
+
+PARSER_VERSION = parser_version()
+
+def file_hash(path, block_size=1024 * 1024):
+    """SHA-256 do conteúdo do arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cache_path(pdf_path, cache_dir=CACHE_DIR):
+    """Caminho da tabela extraída deste PDF (pelo conteúdo) com esta versão do extrator."""
+    return os.path.join(cache_dir, f"{file_hash(pdf_path)}-{PARSER_VERSION}.arrow")
+
+def table_schema():
+    """Esquema Arrow da tabela: texto, com OD e AMB em dicionário (os códigos de build_categories)."""
+    return pa.schema([
+        (column, pa.dictionary(pa.int16(), pa.string()) if column in ABBREVIATION_COLUMNS else pa.string())
+        for column in TABLE_COLUMNS
+    ])
+
+def load_table(path):
+    """Lê a tabela do cache (mapeada em memória) ou devolve None se não houver."""
+    if pa is None or not os.path.exists(path):
+        return None
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_stream(source).read_all()
+
+def table_rows(table):
+    """Gera as linhas de uma tabela do cache, já com as descrições da legenda."""
+    for batch in table.to_batches():
+        yield from map(list, zip(*(column.to_pylist() for column in batch.columns)))
+
+def cache_pages(pages, path, categories):
+    """Repassa as linhas de cada página enquanto grava a tabela no cache, um lote por página.
+    
+    O arquivo só aparece com o nome final quando a extração termina; uma
+    execução interrompida não deixa cache pela metade. Valores de OD/AMB
+    fora da legenda ganham códigos novos no dicionário.
+    """
+    if pa is None:
+        for rows in pages:
+            yield from rows
+        return
+    
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = path + '.tmp'
+    schema = table_schema()
+    dictionary = list(categories)
+    codes = {}
+    
+    try:
+        options = pa.ipc.IpcWriteOptions(compression='zstd')
+        with pa.OSFile(temporary, 'wb') as sink, pa.ipc.new_stream(sink, schema, options=options) as writer:
+            for rows in pages:
+                columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in TABLE_COLUMNS]
+                for position in ABBREVIATION_POSITIONS:
+                    for index, value in enumerate(columns[position]):
+                        if not isinstance(value, int):
+                            if value not in codes:
+                                codes[value] = len(dictionary)
+                                dictionary.append(value)
+                            columns[position][index] = codes[value]
+                arrays = [
+                    pa.DictionaryArray.from_arrays(pa.array(values, pa.int16()), pa.array(dictionary, pa.string()))
+                    if position in ABBREVIATION_POSITIONS else pa.array(values, pa.string())
+                    for position, values in enumerate(columns)
+                ]
+                writer.write_batch(pa.record_batch(arrays, schema=schema))
+                yield from rows
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    
+    os.replace(temporary, path)
+    
+    # Versões antigas do extrator para o mesmo PDF não serão mais lidas
+    prefix = os.path.basename(path).split('-')[0]
+    for name in os.listdir(os.path.dirname(path) or '.'):
+        if name.startswith(prefix + '-') and name != os.path.basename(path):
+            os.remove(os.path.join(os.path.dirname(path) or '.', name))
 
 def main():
     pdf_url = "https://www.gov.br/ans/pt-br/acesso-a-informacao/participacao-da-sociedade/atualizacao-do-rol-de-procedimentos/Anexo_I_Rol_2021RN_465.2021_RN627L.2024.pdf"
@@ -76,11 +351,18 @@ def main():
     zip_filename = "Teste_Nicollas.zip"
     
     download_pdf(pdf_url, pdf_filename)
-    text = extract_text_from_pdf(pdf_filename)
-    data_df = parse_text_to_dataframe(text)
-    legends = extract_legends(text)
-    data_df = replace_abbreviations(data_df, legends)
-    save_csv_and_zip(data_df, csv_filename, zip_filename)
+    
+    # Mesmo PDF e mesmo extrator: a tabela sai do cache, sem abrir o documento
+    path = cache_path(pdf_filename)
+    table = load_table(path)
+    
+    if table is not None:
+        print(f"Tabela carregada do cache '{path}'.")
+        write_csv_to_zip(table_rows(table), [], csv_filename, zip_filename)
+    else:
+        categories, codes = build_categories(find_legends(pdf_filename))
+        rows = cache_pages(iter_pages(pdf_filename, codes), path, categories)
+        write_csv_to_zip(rows, categories, csv_filename, zip_filename)
     
     print(f"Arquivo ZIP '{zip_filename}' criado com sucesso!")
 
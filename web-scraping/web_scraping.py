@@ -3,10 +3,17 @@ from bs4 import BeautifulSoup
 import os
 import zipfile
 import re
+import sys
+
+# Pacote comum/ na raiz do repositório
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from comum.download import NAO_MODIFICADO, baixar
 
 def download_file(url, local_filename):
     """
-    Faz o download de um arquivo e o salva localmente
+    Faz o download de um arquivo e o salva localmente.
+    Se ele já foi baixado antes, só revalida no servidor (ver comum.download)
     """
     print(f"Baixando arquivo de {url}...")
     
@@ -15,19 +22,17 @@ def download_file(url, local_filename):
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
-    # Faz o request para baixar o arquivo
-    response = requests.get(url, headers=headers, stream=True)
+    try:
+        situacao = baixar(url, local_filename, cabecalhos=headers)
+    except Exception as e:
+        print(f"Falha ao baixar arquivo: {e}")
+        return False
     
-    # Verifica se o download foi bem-sucedido
-    if response.status_code == 200:
-        with open(local_filename, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        print(f"Arquivo salvo como '{local_filename}'")
-        return True
+    if situacao == NAO_MODIFICADO:
+        print(f"Arquivo '{local_filename}' sem alterações no servidor")
     else:
-        print(f"Falha ao baixar arquivo. Status code: {response.status_code}")
-        return False
+        print(f"Arquivo salvo como '{local_filename}'")
+    return True
 
 def create_zip(files, zip_filename):
     """